@@ -11,6 +11,8 @@ __all__ = [
     "mounter",
     "archiver",
     "chunker",
+    "inline_chunker",
+    "scanner",
     "syncer",
     "util",
     "types",
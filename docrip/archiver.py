@@ -2,21 +2,44 @@
 archiver.py
 Functions to:
 - Build the find(1) command that emits a NUL-separated list honoring max_file_size
-- Select compressor command (zstd/pigz) with thread count
+  (or the bundled `docrip-scan` helper when present in ./bin or PATH)
+- Pick the file lister (archive.scanner): that command or an in-process Scan
+- Select compressor command (zstd/pzstd/pigz) with thread count
 Note: tar will read the NUL-separated list via --null -T - and -C <mp>.
+Tool lookups (docrip-scan, pzstd) are cached per process: PATH is set up
+once (prepend_bin_to_path) before any volume is processed.
 """
 
 from __future__ import annotations
 import shlex
+from functools import lru_cache
 from pathlib import Path
 from .types import Config
+from .util import which_quiet
+from .scanner import Scan
+
+SCAN_HELPER = "docrip-scan"
+
+
+@lru_cache(maxsize=None)
+def _have_tool(name: str) -> bool:
+    return which_quiet(name)
 
 
 def build_find_cmd(mp: Path, max_mb: int) -> str:
     """
     Emit RELATIVE paths by 'cd' into the mountpoint.
     Include directories and symlinks always; include files under size limit (if >0).
+
+    If the native `docrip-scan` helper is available it is used instead of find(1).
+    Contract: NUL-separated paths relative to --root, same selection as the find
+    expression below, never crossing into other filesystems (like -xdev).
+    The helper batches getdents64/statx through io_uring, which is what dominates
+    wall time on trees with millions of small files.
     """
+    if _have_tool(SCAN_HELPER):
+        size = f" --max-size {max_mb}M" if max_mb and max_mb > 0 else ""
+        return f"{SCAN_HELPER} --root {shlex.quote(str(mp))}{size} --print0"
     if max_mb and max_mb > 0:
         return (
             f"cd {shlex.quote(str(mp))} && find . -xdev "
@@ -30,10 +53,34 @@ def build_find_cmd(mp: Path, max_mb: int) -> str:
         )
 
 
+def file_lister(mp: Path, max_mb: int, scanner: str = "auto") -> str | Scan:
+    """
+    archive.scanner: "find" always shells out (to docrip-scan when installed,
+    else find), "python" always walks with os.scandir in-process, and "auto"
+    prefers the native helper and falls back to the in-process walk.
+    """
+    if scanner == "python" or (scanner == "auto" and not _have_tool(SCAN_HELPER)):
+        return Scan(mp, max_mb)
+    return build_find_cmd(mp, max_mb)
+
+
 def compressor_cmd(cfg: Config, threads: int) -> str:
-    lvl = str(cfg.compression_level)
+    """
+    zstd uses a 128 MiB long-distance window (--long=27, ~1-2 GiB extra RAM per
+    volume; still decodable by plain `zstd -d`). zstd_adapt adds --adapt so the
+    level backs off while downstream stages stall; the archive size then
+    depends on timing and differs between runs.
+    With multi_frame and pzstd installed, pzstd is used instead: its output is
+    a sequence of independent frames that `pzstd -d` decompresses in parallel
+    (plain `zstd -d` reads it too). Ratio cost is <0.5%; pzstd has no
+    --long/--adapt.
+    """
+    level = cfg.compression_level
     if cfg.compressor == "zstd":
-        return f"zstd -T{threads} -{lvl}"
+        if cfg.multi_frame and _have_tool("pzstd"):
+            return f"pzstd -p {threads} -{level} -c"
+        adapt = " --adapt" if cfg.zstd_adapt else ""
+        return f"zstd -T{threads} --long=27 -{level}{adapt}"
     if cfg.compressor == "pigz":
-        return f"pigz -p {threads} -{lvl}"
+        return f"pigz -p {threads} -{level}"
     raise ValueError("Unsupported compressor")
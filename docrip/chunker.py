@@ -1,67 +1,413 @@
 """
 chunker.py
 Build the archive pipeline:
-  find | tar (preserve xattrs/ACLs) | compress | split (chunk files)
-Compute:
-  - .whole.sha256 (of the compressed stream)
-  - per-chunk *.sha256
+  list | tar (preserve xattrs/ACLs) | compress -> ChunkWriter (chunk files)
+The file list comes from find/docrip-scan or an in-process scandir walk
+(scanner.Scan) written to tar's stdin by a thread. Each stage is its own
+process joined by 1 MiB pipes (F_SETPIPE_SZ), so every stage reports its
+own exit status. The compressed stream is read back
+in-process, hashed and cut into fixed-size parts in the same pass
+(no tee/sha256sum subshells, no split process).
+Compute (<algo> = integrity.algorithm: any hashlib name, or "blake3"):
+  - .whole.<algo> (of the compressed stream, or with integrity.merkle_whole
+    of the part digests: H("<hex0>\n<hex1>\n..."), manifest whole_is_merkle)
+  - per-chunk *.<algo> (hashed on a background thread)
   - .parts and .manifest.json
 """
 
 from __future__ import annotations
-import json
+import fcntl, hashlib, os, shlex, subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from .types import Config
-from .util import run, write_json
-from .archiver import build_find_cmd, compressor_cmd
+from typing import BinaryIO, List, Any
+from .types import Config, Hasher, ByteSink
+from .util import run, which_quiet, write_json
+from .archiver import compressor_cmd, file_lister
+from .scanner import Scan
+from . import inline_chunker
+
+try:  # optional: SIMD + multi-threaded BLAKE3 (pip install blake3)
+    import blake3
+except ImportError:  # pragma: no cover - depends on the build environment
+    blake3 = None  # type: ignore[assignment]
+
+PIPE_SIZE = 1024 * 1024  # kernel pipe capacity between stages (default is 64 KiB)
+READ_BLOCK = PIPE_SIZE  # a raw read() returns at most one pipe's worth
+HASH_QUEUE = 16  # blocks a background part hasher may lag behind the writer
+# _stream reads into a ring of preallocated buffers; a ChunkWriter in
+# background mode is done with a buffer HASH_QUEUE writes later, so a ring one
+# larger than that plus the block being read is safe to reuse.
+READ_RING = HASH_QUEUE + 2
+
+# Filesystems that can carry xattrs/ACLs; on the rest (vfat, exfat, ntfs-3g,
+# hfs, ...) tar would only collect one ENOTSUP llistxattr per file.
+XATTR_FSTYPES = frozenset({"ext2", "ext3", "ext4", "xfs", "btrfs", "zfs"})
+
+
+def new_hasher(algo: str) -> Hasher:
+    """Return a hash object for `algo`; BLAKE3 uses all cores on large updates."""
+    if algo == "blake3":
+        if blake3 is None:
+            raise RuntimeError(
+                "integrity.algorithm = 'blake3' requires the 'blake3' package"
+            )
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return hashlib.new(algo)
+
+
+def _pipe() -> tuple[int, int]:
+    """os.pipe() with its capacity raised to PIPE_SIZE (best effort, Linux only)."""
+    r, w = os.pipe()
+    try:
+        fcntl.fcntl(w, fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+    except (AttributeError, OSError):
+        pass  # capped by /proc/sys/fs/pipe-max-size or not Linux; keep the default
+    return r, w
+
+
+def pick_tar(impl: str) -> str:
+    """Resolve archive.tar_impl to "gnu" or "bsd" (libarchive bsdtar, auto's pick)."""
+    if impl in ("auto", "bsd") and which_quiet("bsdtar"):
+        return "bsd"
+    if impl == "bsd":
+        print("[warn] tar_impl = 'bsd' but bsdtar not found; using GNU tar")
+    return "gnu"
+
+
+def drop_page_cache(f: BinaryIO) -> None:
+    """
+    Flush `f` to disk and drop its pages (POSIX_FADV_DONTNEED) so multi-GB
+    spool output does not evict useful cache; best effort.
+    """
+    f.flush()
+    try:
+        os.fdatasync(f.fileno())
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    except (AttributeError, OSError):
+        pass
+
+
+def wants_xattrs(cfg: Config, fstype: str | None) -> bool:
+    """preserve_xattrs, limited to filesystems that have them (unknown fstype: keep)."""
+    return cfg.preserve_xattrs and (not fstype or fstype in XATTR_FSTYPES)
+
+
+def tar_args(mp: Path, impl: str = "gnu", xattrs: bool = True) -> List[str]:
+    """
+    tar reads the NUL-separated list on stdin. --no-recursion is required:
+    the list already names every directory *and* its entries, so recursing
+    would archive each file twice and bypass the max_file_size filter.
+    bsdtar spells the same thing -n, and --xattrs/--acls (not GNU's
+    --xattrs-include); it has a cheaper per-file loop on small-file trees.
+    GNU tar skips xattrs/ACLs unless asked; bsdtar collects them by default.
+    """
+    if impl == "bsd":
+        meta = ["--acls", "--xattrs"] if xattrs else ["--no-acls", "--no-xattrs"]
+        return [
+            "bsdtar",
+            "-C",
+            str(mp),
+            "--numeric-owner",
+            *meta,
+            "--null",
+            "-n",
+            "-T",
+            "-",
+            "-cf",
+            "-",
+        ]
+    meta = ["--acls", "--xattrs", "--xattrs-include=*"] if xattrs else []
+    return [
+        "tar",
+        "-C",
+        str(mp),
+        "--numeric-owner",
+        *meta,
+        "--null",
+        "--no-recursion",
+        "-T",
+        "-",
+        "-cpf",
+        "-",
+    ]
+
+
+class ChunkWriter:
+    """
+    File-like sink that cuts the stream into fixed-size parts named
+    <prefix>0000, <prefix>0001, ... (same layout as `split -d -a 4`) and hashes
+    each part while writing it, leaving a `<part>.<algo>` sidecar on rotation.
+    With drop_cache, each finished part is flushed and evicted from the page cache.
+    With background, part hashing runs on its own thread (hashlib releases the
+    GIL), so it overlaps the writes and the whole-stream hash; write() then
+    keeps a reference to `buf` until HASH_QUEUE further writes (or close()),
+    so callers that reuse buffers must rotate more than HASH_QUEUE of them.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        chunk_bytes: int,
+        algo: str,
+        drop_cache: bool = False,
+        background: bool = False,
+    ):
+        self.prefix = prefix
+        self.chunk_bytes = chunk_bytes
+        self.algo = algo
+        self.drop_cache = drop_cache
+        self.parts: List[Path] = []
+        self.digests: List[str] = []
+        self._f: BinaryIO | None = None
+        self._h: Hasher | None = None
+        self._left = 0
+        self._hq: ThreadPoolExecutor | None = None
+        if background:
+            self._hq = ThreadPoolExecutor(1, thread_name_prefix="parthash")
+        self._pending: deque[Future] = deque()
+
+    def _open_next(self) -> BinaryIO:
+        path = Path(f"{self.prefix}{len(self.parts):04d}")
+        self.parts.append(path)
+        self._f = f = open(path, "wb")
+        self._h = new_hasher(self.algo)
+        self._left = self.chunk_bytes
+        return f
+
+    def _update(self, piece: memoryview) -> None:
+        assert self._h is not None  # set by _open_next before any write
+        if self._hq is None:
+            self._h.update(piece)
+            return
+        self._pending.append(self._hq.submit(self._h.update, piece))
+        if len(self._pending) > HASH_QUEUE:
+            self._pending.popleft().result()
+
+    def _finish(self) -> None:
+        assert self._f is not None and self._h is not None
+        if self.drop_cache:
+            drop_page_cache(self._f)
+        self._f.close()
+        self._f = None
+        while self._pending:
+            self._pending.popleft().result()
+        path = self.parts[-1]
+        digest = self._h.hexdigest()
+        self.digests.append(digest)
+        sidecar = path.with_name(f"{path.name}.{self.algo}")
+        sidecar.write_text(f"{digest}  {path.name}\n")
+
+    def merkle_digest(self) -> str:
+        """Hash of the part digests, one hex line each, in part order."""
+        h = new_hasher(self.algo)
+        h.update("".join(f"{d}\n" for d in self.digests).encode())
+        return h.hexdigest()
+
+    def write(self, buf: Any) -> int:
+        view = memoryview(buf)
+        while view:
+            f = self._f if self._f is not None else self._open_next()
+            piece = view[: self._left]
+            f.write(piece)
+            self._update(piece)
+            self._left -= len(piece)
+            view = view[len(piece) :]
+            if self._left == 0:
+                self._finish()
+        return len(buf)
+
+    def close(self) -> None:
+        try:
+            if self._f is not None:
+                self._finish()
+        finally:
+            if self._hq is not None:
+                self._hq.shutdown()
+
+
+def _stream(
+    lister: str | Scan,
+    tar_cmd: List[str],
+    comp_cmd: List[str],
+    out: ByteSink,
+    algo: str | None,
+) -> str | None:
+    """
+    Run lister | tar | compressor and copy the compressed stream into `out`
+    while hashing it. `lister` is a shell command (find, docrip-scan) or a Scan
+    fed from a thread. Returns the hex digest ("" when algo is None and the
+    stream is not hashed here), or None if a stage failed.
+    hashlib releases the GIL on large buffers and uses OpenSSL's SHA-NI path
+    where the CPU has it, so this keeps pace with the compressor.
+    """
+    h = new_hasher(algo) if algo else None
+    procs: List[subprocess.Popen] = []
+    feeder = None
+    r1, w1 = _pipe()
+    if isinstance(lister, Scan):
+        feeder = lister.feed(w1)  # the thread owns and closes w1
+    else:
+        try:
+            procs.append(subprocess.Popen(["/bin/sh", "-c", lister], stdout=w1))
+        finally:
+            os.close(w1)
+    r2, w2 = _pipe()
+    try:
+        procs.append(subprocess.Popen(tar_cmd, stdin=r1, stdout=w2))
+    finally:
+        os.close(r1)
+        os.close(w2)
+    r3, w3 = _pipe()
+    try:
+        procs.append(subprocess.Popen(comp_cmd, stdin=r2, stdout=w3))
+    finally:
+        os.close(r2)
+        os.close(w3)
+    src = os.fdopen(r3, "rb", buffering=0)
+    # readinto a fixed ring instead of allocating a fresh 1 MiB bytes per read
+    ring = [memoryview(bytearray(READ_BLOCK)) for _ in range(READ_RING)]
+    i = 0
+    try:
+        while True:
+            n = src.readinto(ring[i])
+            if not n:
+                break
+            block = ring[i][:n]
+            if h is not None:
+                h.update(block)
+            out.write(block)
+            i = (i + 1) % READ_RING
+    except BaseException:
+        for p in procs:
+            p.kill()
+        raise
+    finally:
+        src.close()
+        rcs = [p.wait() for p in procs]
+        if isinstance(lister, Scan):
+            assert feeder is not None
+            feeder.join()
+            rcs.insert(0, 1 if lister.errors else 0)  # find's rc for unreadable entries
+        find_rc, tar_rc, comp_rc = rcs
+
+    if find_rc != 0:
+        print(f"[warn] file listing exited rc={find_rc}; some entries may be missing")
+    # GNU tar exits 1 for files that changed or vanished and >1 for fatal
+    # errors; bsdtar exits 1 for both, so any bsdtar failure is fatal
+    gnu = os.path.basename(tar_cmd[0]) != "bsdtar"
+    if tar_rc == 1 and gnu:
+        print("[warn] tar reported files that changed or vanished while reading")
+    if tar_rc > (1 if gnu else 0) or comp_rc != 0:
+        rcs_msg = f"tar rc={tar_rc}, compressor rc={comp_rc}"
+        print(f"[error] archive pipeline failed ({rcs_msg})")
+        return None
+    return h.hexdigest() if h is not None else ""
 
 
 def make_chunks(
-    cfg: Config, mp: Path, outdir: Path, compressor_threads: int, dry: bool = False
+    cfg: Config,
+    mp: Path,
+    outdir: Path,
+    compressor_threads: int,
+    dry: bool = False,
+    fstype: str | None = None,
 ) -> bool:
-    outdir.mkdir(parents=True, exist_ok=True)
+    if not dry:
+        outdir.mkdir(parents=True, exist_ok=True)
     ext = "zst" if cfg.compressor == "zstd" else "gz"
-    manifest = {"ext": ext, "chunk_size_mb": cfg.chunk_size_mb, "whole_sha256": None}
+    algo = cfg.integrity_algo
+    whole_key = f"whole_{algo}"  # "whole_sha256" for the default algorithm
+    manifest: dict[str, Any] = {
+        "ext": ext,
+        "chunk_size_mb": cfg.chunk_size_mb,
+        "integrity_algo": algo,
+        "whole_is_merkle": False,
+        "tar": None,
+        "compressor": None,
+        whole_key: None,
+    }
     manifest_path = outdir / ".manifest.json"
     parts_list = outdir / ".parts"
-    whole_sha = outdir / ".whole.sha256"
+    whole_sha = outdir / f".whole.{algo}"
+    new_hasher(algo)  # fail before spawning anything if the algorithm is unavailable
+
+    lister = file_lister(mp, cfg.max_file_size_mb, cfg.scanner)
+    xattrs = wants_xattrs(cfg, fstype)
+    inline = cfg.inline_archive and inline_chunker.available()
+    if cfg.inline_archive and not inline:
+        print(
+            "[warn] inline_archive set but libarchive-c is unavailable;"
+            " using the tar pipeline"
+        )
+    if inline:
+        manifest["tar"] = "libarchive"
+        filter_name, filter_opts = inline_chunker.filter_for(
+            cfg.compressor, cfg.compression_level, compressor_threads
+        )
+        manifest["compressor"] = filter_name
+        src_cmd = f"{lister} | <libarchive pax_restricted+{filter_name} {filter_opts}>"
+    else:
+        tar_impl = manifest["tar"] = pick_tar(cfg.tar_impl)
+        tar_cmd = tar_args(mp, tar_impl, xattrs)
+        comp_cmd = shlex.split(compressor_cmd(cfg, compressor_threads))
+        # e.g. "pzstd" tells restores to use pzstd -d
+        manifest["compressor"] = comp_cmd[0]
+        src_cmd = f"{lister} | {shlex.join(tar_cmd)} | {shlex.join(comp_cmd)}"
 
-    tar_flags = "--numeric-owner --acls --xattrs --xattrs-include='*'"
-    find_cmd = build_find_cmd(mp, cfg.max_file_size_mb)
-    comp_cmd = compressor_cmd(cfg, compressor_threads)
-    tar_cmd = f"{find_cmd} | tar -C {str(mp)!s} {tar_flags} --null -T - -cpf -"
+    def produce(sink: ByteSink, stream_algo: str | None) -> str | None:
+        if inline:
+            hasher = new_hasher(stream_algo) if stream_algo else None
+            return inline_chunker.stream_archive(
+                lister, mp, sink, hasher, filter_name, filter_opts, xattrs
+            )
+        return _stream(lister, tar_cmd, comp_cmd, sink, stream_algo)
 
     if cfg.chunk_size_mb and cfg.chunk_size_mb > 0:
         split_prefix = str(outdir / f"{outdir.name}.tar.{ext}.part")
-        pipe = (
-            f"{tar_cmd} | {comp_cmd} "
-            f"| tee >(sha256sum | awk '{{print $1}}' > {str(whole_sha)!s}) "
-            f"| split -b {cfg.chunk_size_mb}M -d -a 4 - {split_prefix}"
+        if dry:
+            run(
+                f"{src_cmd} > {split_prefix}NNNN  # {cfg.chunk_size_mb}M parts",
+                dry=True,
+            )
+            return True
+        merkle = cfg.merkle_whole
+        manifest["whole_is_merkle"] = merkle
+        writer = ChunkWriter(
+            split_prefix,
+            cfg.chunk_size_mb * 1024 * 1024,
+            algo,
+            cfg.drop_page_cache,
+            background=True,
         )
-        rc, _ = run(pipe, dry=dry)
-        if rc != 0:
+        try:
+            # Merkle mode derives the whole hash from the part digests, so the
+            # stream itself is hashed only once (by the part hasher).
+            digest = produce(writer, None if merkle else algo)
+        finally:
+            writer.close()
+        if digest is None:
             return False
-        run(
-            f'for p in {str(outdir)!s}/*.part*; do sha256sum "$p" > "$p.sha256"; done',
-            dry=dry,
-        )
-        run(
-            f"ls -1 {str(outdir)!s}/*.part* | sort | sed 's#^.*/##' > {str(parts_list)!s}",
-            dry=dry,
-        )
-        if not dry and whole_sha.exists():
-            manifest["whole_sha256"] = whole_sha.read_text().strip()
-            write_json(manifest_path, manifest)
+        if merkle:
+            digest = writer.merkle_digest()
+        whole_sha.write_text(digest + "\n")
+        parts_list.write_text("".join(f"{p.name}\n" for p in writer.parts))
+        manifest[whole_key] = digest
+        write_json(manifest_path, manifest)
         return True
     else:
         archive_path = outdir / f"{outdir.name}.tar.{ext}"
-        pipe = f"{tar_cmd} | {comp_cmd} > {str(archive_path)!s}"
-        rc, _ = run(pipe, dry=dry)
-        if rc != 0:
+        if dry:
+            run(f"{src_cmd} > {str(archive_path)!s}", dry=True)
+            return True
+        with open(archive_path, "wb") as f:
+            digest = produce(f, algo)
+            if digest is not None and cfg.drop_page_cache:
+                drop_page_cache(f)
+        if digest is None:
             return False
-        run(f"sha256sum {str(archive_path)!s} > {str(whole_sha)!s}", dry=dry)
-        if not dry:
-            parts_list.write_text(f"{archive_path.name}\n")
-            manifest["whole_sha256"] = whole_sha.read_text().strip()
-            write_json(manifest_path, manifest)
+        whole_sha.write_text(digest + "\n")
+        parts_list.write_text(f"{archive_path.name}\n")
+        manifest[whole_key] = digest
+        write_json(manifest_path, manifest)
         return True
@@ -26,6 +26,13 @@ def check_root_access() -> None:
         sys.exit(1)
 
 
+def _split_csv(value: str | None) -> list[str]:
+    """Split a comma-separated CLI value, dropping blanks."""
+    if not value:
+        return []
+    return [d for d in (x.strip() for x in value.split(",")) if d]
+
+
 def validate_arguments(args) -> None:
     """Validate CLI arguments and provide helpful error messages."""
     # Validate workers
@@ -36,7 +43,7 @@ def validate_arguments(args) -> None:
     
     # Validate --only format
     if args.only:
-        devices = [d.strip() for d in args.only.split(",") if d.strip()]
+        devices = _split_csv(args.only)
         invalid_devices = [d for d in devices if not d.startswith("/dev/")]
         if invalid_devices:
             print(f"❌ Error: --only devices must start with /dev/, invalid: {', '.join(invalid_devices)}")
@@ -45,7 +52,7 @@ def validate_arguments(args) -> None:
     
     # Validate --exclude-dev format  
     if args.exclude_dev:
-        devices = [d.strip() for d in args.exclude_dev.split(",") if d.strip()]
+        devices = _split_csv(args.exclude_dev)
         invalid_devices = [d for d in devices if "/" in d]
         if invalid_devices:
             print(f"❌ Error: --exclude-dev should be device names only (no /dev/ prefix), invalid: {', '.join(invalid_devices)}")
@@ -79,8 +86,8 @@ def main(argv=None) -> int:
         # Validate arguments early
         validate_arguments(args)
         
-        # Check for root access unless just listing or help
-        if not args.list:
+        # Check for root access unless just listing, previewing or help
+        if not args.list and not args.dry_run:
             check_root_access()
         
         # Find and load config with error handling
@@ -108,11 +115,11 @@ def main(argv=None) -> int:
         
         # extend avoid list from CLI once
         if args.exclude_dev:
-            cfg.avoid_devices.extend([x.strip() for x in args.exclude_dev.split(",") if x.strip()])
+            cfg.avoid_devices.extend(_split_csv(args.exclude_dev))
         
         only_set = None
         if args.only:
-            only_set = set(d.strip() for d in args.only.split(",") if d.strip())
+            only_set = set(_split_csv(args.only))
         
         return run_plan(cfg, only_set, args.list, args.workers, args.dry_run)
         
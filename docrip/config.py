@@ -58,12 +58,19 @@ def load_config(path: Path) -> Config:
         server_rsync_remote=gv(["server", "rsync_remote"]),
         server_ssh_key=gv(["server", "ssh_key"]),
         server_port=int(gv(["server", "port"], 22)),
+        ssh_multiplex=bool(gv(["server", "ssh_multiplex"], True)),
         compressor=gv(["archive", "compressor"], "zstd"),
         compression_level=int(gv(["archive", "compression_level"], 3)),
         chunk_size_mb=int(gv(["archive", "chunk_size_mb"], 4096)),
         stream_direct=bool(gv(["archive", "stream_direct"], False)),
         spool_dir=Path(gv(["archive", "spool_dir"], "/var/tmp/docrip")),
         preserve_xattrs=bool(gv(["archive", "preserve_xattrs"], True)),
+        zstd_adapt=bool(gv(["archive", "zstd_adapt"], False)),
+        multi_frame=bool(gv(["archive", "multi_frame"], True)),
+        tar_impl=gv(["archive", "tar_impl"], "auto"),
+        drop_page_cache=bool(gv(["archive", "drop_page_cache"], True)),
+        inline_archive=bool(gv(["archive", "inline_archive"], False)),
+        scanner=gv(["archive", "scanner"], "auto"),
         include_fstypes=gv(["discovery", "include_fstypes"], []),
         skip_fstypes=gv(["discovery", "skip_fstypes"], []),
         skip_if_encrypted=bool(gv(["discovery", "skip_if_encrypted"], True)),
@@ -74,11 +81,16 @@ def load_config(path: Path) -> Config:
         max_file_size_mb=int(gv(["filters", "max_file_size_mb"], 100)),
         workers=int(gv(["runtime", "workers"], 0)),
         rsync_bwlimit_kbps=int(gv(["runtime", "rsync_bwlimit_kbps"], 0)),
+        rsync_parallel=int(gv(["runtime", "rsync_parallel"], 0)),
+        executor=gv(["runtime", "executor"], "process"),
         log_level=gv(["runtime", "log_level"], "INFO"),
         date_fmt=gv(["naming", "date_fmt"], "%Y%m%d"),
         token_source=gv(["naming", "token_source"], "machine-id"),
+        token_source_hash=gv(["naming", "token_source_hash"], "sha256"),
         pattern=gv(["naming", "pattern"], "{date}_{token}_d{disk}_p{part}"),
         integrity_algo=gv(["integrity", "algorithm"], "sha256"),
+        merkle_whole=bool(gv(["integrity", "merkle_whole"], False)),
         run_summary_dir=Path(gv(["output", "run_summary_dir"], "/var/log/docrip")),
         per_volume_json=bool(gv(["output", "per_volume_json"], True)),
+        per_volume_json_format=gv(["output", "per_volume_json_format"], "files"),
     )
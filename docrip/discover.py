@@ -2,7 +2,9 @@
 discover.py
 Device discovery and selection pipeline:
 - Exclude boot/live media
-- Assemble layers (handled in layers.py) then enumerate with lsblk (JSON)
+- Assemble layers (handled in layers.py), then snapshot state once with
+  gather_state(): one lsblk -J, one blkid, one findmnt -J
+- Enumerate with lsblk (JSON)
 - Encrypted-at-rest detection heuristics (blkid)
 - Filter by filesystem allowlist/denylist and size threshold
 - Assign (diskno, partno) for stable naming
@@ -10,34 +12,37 @@ Device discovery and selection pipeline:
 
 from __future__ import annotations
 import json, re
-from pathlib import Path
+from operator import attrgetter
 from typing import List, Dict, Any
-from .types import Config, Volume
+from .types import Config, DiscoveryState, Volume
 from .util import run
-from .layers import pk_disk_of
+from .layers import parent_map, pk_disk_of
 
+_PARTNO_RE = re.compile(r"(\d+)$")
+_DISK_RE = re.compile(r"^(/dev/[a-z]+)")
+_CONSIDER = frozenset({"part", "lvm", "raid0", "raid1", "raid10", "crypt", "rom"})
 
-def find_live_usb_devices() -> set[str]:
+
+def find_live_usb_devices(state: DiscoveryState) -> set[str]:
     """Identify live USB devices to exclude (but not target boot devices)."""
     exclude = set()
     # Only exclude live USB mountpoints, not the target system root
     for mp in ("/cdrom", "/isodevice"):
-        rc, out = run(["findmnt", "-no", "SOURCE", mp], capture=True)
-        if rc == 0 and out.strip().startswith("/dev/"):
-            exclude.add(out.strip())
+        src = state.mounts.get(mp, "")
+        if src.startswith("/dev/"):
+            exclude.add(src)
     return exclude
 
 
-def find_target_boot_devices() -> set[str]:
+def find_target_boot_devices(state: DiscoveryState) -> set[str]:
     """Identify target system boot devices for labeling (not exclusion)."""
     boot_devices = set()
-    rc, out = run(["findmnt", "-no", "SOURCE", "/"], capture=True)
-    if rc == 0:
-        src = out.strip()
+    src = state.mounts.get("/")
+    if src:
         if src.startswith("/dev/"):
             boot_devices.add(src)
             # Also add the parent disk
-            m = re.match(r"^(/dev/[a-z]+)", src)
+            m = _DISK_RE.match(src)
             if m:
                 boot_devices.add(m.group(1))
     return boot_devices
@@ -50,7 +55,7 @@ def lsblk_json() -> Dict[str, Any]:
             "-b",
             "-J",
             "-o",
-            "NAME,KNAME,PATH,TYPE,SIZE,FSTYPE,FSVER,LABEL,UUID,MOUNTPOINT,RM,RO,MODEL,TRAN",
+            "NAME,KNAME,PKNAME,PATH,TYPE,SIZE,FSTYPE,FSVER,LABEL,UUID,MOUNTPOINT,RM,RO,MODEL,TRAN",
         ],
         capture=True,
     )
@@ -62,23 +67,55 @@ def lsblk_json() -> Dict[str, Any]:
         raise RuntimeError(f"lsblk output is not valid JSON: {e}")
 
 
-def blkid_export(dev: str) -> Dict[str, str]:
-    rc, out = run(["blkid", "-o", "export", dev], capture=True)
+def blkid_all() -> Dict[str, Dict[str, str]]:
+    """
+    Probe every device in one blkid call (-c /dev/null: no stale cache file,
+    layers assembled moments ago are seen). Records are blank-line separated;
+    export lines are bare KEY=value, so no stripping is needed.
+    """
+    rc, out = run(["blkid", "-c", "/dev/null", "-o", "export"], capture=True)
     if rc != 0:
         return {}
-    ans = {}
-    for line in out.splitlines():
-        if "=" in line:
-            k, v = line.split("=", 1)
-            ans[k.strip()] = v.strip()
-    return ans
+    by_dev: Dict[str, Dict[str, str]] = {}
+    for block in out.split("\n\n"):
+        ans = {}
+        for line in block.splitlines():
+            k, sep, v = line.partition("=")
+            if sep:
+                ans[k] = v
+        if ans.get("DEVNAME"):
+            by_dev[ans["DEVNAME"]] = ans
+    return by_dev
+
+
+def findmnt_all() -> Dict[str, str]:
+    """Mount target -> source for every mounted filesystem (one findmnt call)."""
+    rc, out = run(["findmnt", "-J", "-l", "-o", "SOURCE,TARGET"], capture=True)
+    if rc != 0:
+        return {}
+    try:
+        fss = json.loads(out).get("filesystems", [])
+    except json.JSONDecodeError:
+        return {}
+    return {fs["target"]: fs.get("source") or "" for fs in fss if fs.get("target")}
+
+
+def gather_state(with_blkid: bool = True) -> DiscoveryState:
+    """Snapshot lsblk/blkid/findmnt once; call after assemble_layers."""
+    tree = lsblk_json()
+    return DiscoveryState(
+        lsblk_tree=tree,
+        parent_of=parent_map(tree.get("blockdevices", [])),
+        blkid_by_dev=blkid_all() if with_blkid else {},
+        mounts=findmnt_all(),
+    )
 
 
-def is_encrypted(dev: str, fstype: str) -> bool:
+def is_encrypted(state: DiscoveryState, dev: str, fstype: str) -> bool:
     """Heuristic: identify at-rest encryption we should not open."""
     if fstype == "crypto_LUKS":
         return True
-    info = blkid_export(dev)
+    info = state.blkid_by_dev.get(dev, {})
     t = info.get("TYPE", "").lower()
     label = info.get("LABEL", "").lower()
     if "crypto_luks" in t:
@@ -97,11 +134,13 @@ def _build_disk_index(blockdevices: List[Dict[str, Any]]) -> Dict[str, int]:
     return {dev: i for i, dev in enumerate(sorted(disks))}
 
 
-def collect_volumes(cfg: Config) -> List[Volume]:
+def collect_volumes(cfg: Config, state: DiscoveryState | None = None) -> List[Volume]:
     """Return volumes with skip reasons annotated; mounting is handled later."""
-    data = lsblk_json()
-    exclude = find_live_usb_devices()  # Only exclude live USB, not target boot
-    boot_devices = find_target_boot_devices()  # For labeling target boot devices
+    if state is None:
+        state = gather_state(with_blkid=cfg.skip_if_encrypted)
+    data = state.lsblk_tree
+    exclude = find_live_usb_devices(state)  # Only exclude live USB, not target boot
+    boot_devices = find_target_boot_devices(state)  # For labeling target boot devices
     disks_index = _build_disk_index(data.get("blockdevices", []))
     vols: List[Volume] = []
 
@@ -115,16 +154,14 @@ def collect_volumes(cfg: Config) -> List[Volume]:
         t = node.get("type")
         uuid = node.get("uuid")
         model = node.get("model")
-        consider = {"part", "lvm", "raid0", "raid1", "raid10", "crypt", "rom"}
-        if t in consider or (t == "disk" and fstype):
-            enc = is_encrypted(path, fstype) if cfg.skip_if_encrypted else False
-            parent_disk = pk_disk_of(path) or ("/dev/" + kname if t == "disk" else None)
+        if t in _CONSIDER or (t == "disk" and fstype):
+            parent_disk = pk_disk_of(state, kname) or ("/dev/" + kname if t == "disk" else None)
             diskno = disks_index.get(parent_disk, 0)
-            m = re.search(r"(\d+)$", kname or "")
+            m = _PARTNO_RE.search(kname or "")
             partno = int(m.group(1)) if m else 0
             is_boot = path in boot_devices or (parent_disk and parent_disk in boot_devices)
             vols.append(
-                Volume(path, kname, fstype, size, t, uuid, enc, diskno, partno, model, is_boot)
+                Volume(path, kname, fstype, size, t, uuid, None, diskno, partno, model, is_boot)
             )
         for ch in node.get("children") or []:
             walk(ch)
@@ -132,20 +169,28 @@ def collect_volumes(cfg: Config) -> List[Volume]:
     for n in data.get("blockdevices", []):
         walk(n)
 
-    # Apply filters and annotate skip reasons
+    # Apply filters and annotate skip reasons (loop invariants hoisted). The
+    # encryption probe runs last, only for volumes every cheap filter accepted;
+    # v.encrypted stays None for the rest (not checked).
     min_bytes = cfg.min_partition_size_gb * (1024**3)
+    avoid = frozenset(cfg.avoid_devices)
+    skip = frozenset(cfg.skip_fstypes)
+    include = frozenset(cfg.include_fstypes) if cfg.include_fstypes else None
+    skip_enc = cfg.skip_if_encrypted
     for v in vols:
         reason = None
-        if v.path in exclude or Path(v.path).name in cfg.avoid_devices:
+        if v.path in exclude or v.path.rsplit("/", 1)[-1] in avoid:
             reason = "live_usb/avoid"  # Only live USB, not target boot devices
-        elif v.fstype in cfg.skip_fstypes:
+        elif v.fstype in skip:
             reason = f"skip_fstype:{v.fstype}"
-        elif cfg.include_fstypes and (v.fstype not in cfg.include_fstypes):
+        elif include is not None and v.fstype not in include:
             reason = f"unsupported_fstype:{v.fstype}"
-        elif cfg.skip_if_encrypted and v.encrypted:
-            reason = "encrypted"
         elif v.size_bytes < min_bytes:
             reason = f"too_small<{cfg.min_partition_size_gb}G"
+        elif skip_enc:
+            v.encrypted = is_encrypted(state, v.path, v.fstype)
+            if v.encrypted:
+                reason = "encrypted"
         v.skip_reason = reason
     return vols
 
@@ -155,7 +200,7 @@ def print_plan(vols: List[Volume]) -> None:
     print(
         f"{'DEVICE':<20} {'FS':<8} {'SIZE(GB)':>9} {'DISK':>4} {'PART':>4} {'STATUS':<20}"
     )
-    for v in sorted(vols, key=lambda x: (x.diskno, x.partno, x.path)):
+    for v in sorted(vols, key=attrgetter("diskno", "partno", "path")):
         gb = v.size_bytes / (1024**3)
         # Show boot_device status for target boot devices that will be processed
         if v.skip_reason:
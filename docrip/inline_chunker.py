@@ -0,0 +1,131 @@
+"""
+inline_chunker.py
+Optional single-process archiver built on libarchive (python-libarchive-c):
+  file list -> libarchive (pax + zstd/gzip filter) -> write callback
+The write callback hashes the compressed bytes and hands them straight to the
+ChunkWriter, so tar, the compressor and the hash share one pass over the data
+with no pipes in between. Used when archive.inline_archive is set and the
+binding is importable; otherwise make_chunks keeps the process pipeline.
+"""
+
+from __future__ import annotations
+import os, subprocess
+from pathlib import Path
+from typing import Iterator
+from .scanner import Scan
+from .types import ByteSink
+
+try:  # optional: pip install libarchive-c (needs the system libarchive)
+    import libarchive
+    from libarchive import flags as la_flags
+except (ImportError, OSError):  # pragma: no cover - depends on the build environment
+    libarchive = None
+
+WRITE_BLOCK = 1024 * 1024  # libarchive hands the callback one block at a time
+
+
+def available() -> bool:
+    return libarchive is not None
+
+
+def filter_for(compressor: str, level: int, threads: int) -> tuple[str, str]:
+    """libarchive filter name and options matching the external compressor."""
+    if compressor == "zstd":
+        return "zstd", f"zstd:compression-level={level},zstd:threads={threads}"
+    if compressor == "pigz":
+        return "gzip", f"gzip:compression-level={level}"
+    raise ValueError("Unsupported compressor")
+
+
+def _listed(proc: subprocess.Popen) -> Iterator[bytes]:
+    """Split the lister's NUL-separated stdout into paths."""
+    assert proc.stdout is not None  # started with stdout=PIPE
+    pending = b""
+    while True:
+        buf = proc.stdout.read(WRITE_BLOCK)
+        if not buf:
+            break
+        names = (pending + buf).split(b"\0")
+        pending = names.pop()
+        yield from names
+
+
+def stream_archive(
+    lister: str | Scan,
+    mp: Path,
+    out: ByteSink,
+    hasher,
+    filter_name: str,
+    options: str,
+    xattrs: bool = True,
+) -> str | None:
+    """
+    Archive the relative paths printed by the `lister` command (run inside
+    `mp`, as for the pipeline) or walked by a Scan, and write the compressed
+    stream to `out`.
+    Returns the hex digest of the stream ("" when `hasher` is None), or None
+    on failure.
+    Unreadable entries are reported and skipped, like tar's warnings.
+    """
+    read_flags = 0 if xattrs else la_flags.READDISK_NO_XATTR | la_flags.READDISK_NO_ACL
+    errors: list[BaseException] = []
+
+    def write_cb(data) -> int:
+        try:
+            # `data` views libarchive's one reusable block; a background
+            # ChunkWriter may still be hashing it on the next callback
+            data = bytes(data)
+            if hasher is not None:
+                hasher.update(data)
+            out.write(data)
+        except BaseException as e:  # raised inside a ctypes callback; report after
+            errors.append(e)
+            return -1
+        return len(data)
+
+    proc = None
+    if isinstance(lister, Scan):
+        paths = lister.paths()
+    else:
+        proc = subprocess.Popen(["/bin/sh", "-c", lister], stdout=subprocess.PIPE)
+        paths = _listed(proc)
+    skipped = 0
+    try:
+        with libarchive.custom_writer(
+            write_cb,
+            "pax_restricted",
+            filter_name,
+            block_size=WRITE_BLOCK,
+            options=options,
+        ) as archive:
+            for rel in paths:
+                if not rel:
+                    continue
+                name = os.fsdecode(rel)
+                try:
+                    archive.add_files(
+                        str(mp / name), pathname=name, recursive=False, flags=read_flags
+                    )
+                except libarchive.ArchiveError as e:
+                    if errors:
+                        raise
+                    skipped += 1
+                    print(f"[warn] inline archiver skipped {name}: {e}")
+    except libarchive.ArchiveError as e:
+        print(f"[error] inline archiver failed: {errors[0] if errors else e}")
+        return None
+    finally:
+        if isinstance(lister, Scan):
+            list_rc = 1 if lister.errors else 0
+        else:
+            assert proc is not None and proc.stdout is not None
+            proc.stdout.close()
+            list_rc = proc.wait()
+    if errors:
+        print(f"[error] inline archiver failed: {errors[0]}")
+        return None
+    if list_rc != 0:
+        print(f"[warn] file listing exited rc={list_rc}; some entries may be missing")
+    if skipped:
+        print(f"[warn] inline archiver skipped {skipped} unreadable entr(y/ies)")
+    return hasher.hexdigest() if hasher is not None else ""
@@ -4,10 +4,12 @@ Storage layers handling (read-only intent):
 - Assemble md-RAID: mdadm --assemble --scan --readonly
 - Activate LVM VGs: vgchange -ay
 - Import ZFS pools (RO): zpool import -a -o readonly=on -N -f
-- Helper: pk_disk_of (resolve parent disk of a node)
+- Helper: pk_disk_of (resolve parent disk of a node from DiscoveryState)
 """
 
 from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+from .types import DiscoveryState
 from .util import run, which_quiet
 
 
@@ -20,22 +22,29 @@ def assemble_layers(allow_raid: bool, allow_lvm: bool, dry: bool = False) -> Non
         run(["zpool", "import", "-a", "-o", "readonly=on", "-N", "-f"], dry=dry)
 
 
-def pk_disk_of(dev: str) -> str | None:
+def parent_map(blockdevices: List[Dict[str, Any]]) -> Dict[str, Tuple[str, str, str]]:
+    """kname -> (name, type, pkname) from the lsblk JSON tree (needs column PKNAME)."""
+    nodes: Dict[str, Tuple[str, str, str]] = {}
+    stack = list(blockdevices)
+    while stack:
+        n = stack.pop()
+        kname = n.get("kname") or n.get("name")
+        if kname:
+            # multi-parent nodes (md/dm over several members) repeat; first wins
+            entry = (n.get("name") or kname, n.get("type") or "", n.get("pkname") or "")
+            nodes.setdefault(kname, entry)
+        stack.extend(n.get("children") or [])
+    return nodes
+
+
+def pk_disk_of(state: DiscoveryState, kname: str | None) -> str | None:
     """Walk up PKNAME until reaching a 'disk' node; return /dev/<name>."""
     seen = set()
-    cur = dev
-    for _ in range(8):
-        rc, out = run(["lsblk", "-no", "TYPE,PKNAME", cur], capture=True)
-        if rc != 0:
-            break
-        tokens = (out.split() + ["", ""])[:2]
-        t, pk = tokens[0], tokens[1]
+    cur = kname
+    while cur in state.parent_of and cur not in seen:
+        seen.add(cur)
+        name, t, pk = state.parent_of[cur]
         if t == "disk":
-            rc2, out2 = run(["lsblk", "-no", "NAME", cur], capture=True)
-            name = out2.strip()
             return f"/dev/{name}"
-        if not pk or pk in seen:
-            break
-        seen.add(pk)
-        cur = f"/dev/{pk}"
+        cur = pk
     return None
@@ -14,7 +14,8 @@ from .types import Volume
 
 
 def mount_ro(v: Volume, mp: Path, dry: bool = False) -> bool:
-    mp.mkdir(parents=True, exist_ok=True)
+    if not dry:
+        mp.mkdir(parents=True, exist_ok=True)
     fs = v.fstype
     if fs in ("ext2", "ext3", "ext4"):
         cmd = [
@@ -3,99 +3,109 @@ orchestrator.py
 Coordinates the end-to-end flow with concurrency:
   - Assemble layers (RO)
   - Discover volumes & apply filters
-  - For each volume (largest first):
+  - For each volume (largest first), in a pool of worker processes
+    (runtime.executor = "process", forkserver) or threads:
       mount RO -> archive+chunk -> rsync
   - Write run and per-volume JSON summaries
 """
 
 from __future__ import annotations
-import concurrent.futures, os, sys, time
+import concurrent.futures, multiprocessing, os, sys, time
 from datetime import datetime, timezone
+from operator import attrgetter
 from pathlib import Path
 from typing import List
 from .types import Config, Volume, VolumeResult
 from .util import (
     ensure_dir,
     write_json,
+    write_jsonl,
     utc_datestr,
     base36_digest5,
     host_identifier,
     clamp,
     check_optional_tools,
+    CPU_COUNT,
 )
 from .bundle import DEFAULT_CONFIG_PATH, prepend_bin_to_path
 from .layers import assemble_layers
-from .discover import collect_volumes, print_plan
+from .discover import collect_volumes, gather_state, print_plan
 from .mounter import mount_ro, umount
 from .chunker import make_chunks
-from .syncer import rsync_dir
+from .syncer import rsync_dir, start_master, stop_master
 
 
 def derive_token(cfg: Config, date_str: str) -> str:
-    return base36_digest5(f"{date_str}:{host_identifier(cfg.token_source)}")
+    return base36_digest5(
+        f"{date_str}:{host_identifier(cfg.token_source)}", cfg.token_source_hash
+    )
 
 
 def auto_workers(explicit: int) -> int:
     if explicit and explicit > 0:
         return explicit
-    cpu = os.cpu_count() or 2
-    return clamp(1, cpu // 2, 8)
+    return clamp(1, CPU_COUNT // 2, 8)
 
 
 def comp_threads_for(workers: int) -> int:
-    cpu = os.cpu_count() or 2
-    return max(1, (cpu // max(1, workers)) - 1)
+    """Split the CPUs evenly between concurrently running volume pipelines."""
+    return max(1, CPU_COUNT // max(1, workers))
+
+
+def make_executor(cfg: Config, workers: int) -> concurrent.futures.Executor:
+    """
+    One interpreter per volume keeps each pipeline's Python work (hashing
+    loop, chunk writer, scandir feed) off a shared GIL. forkserver children
+    start from a small clean server process: no copy of the parent's memory
+    and no fork-after-threads hazards.
+    """
+    if cfg.executor == "process":
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+
+def volume_paths(
+    cfg: Config, v: Volume, token: str, date_str: str
+) -> tuple[str, Path, Path]:
+    """Output name, spool directory and mountpoint of a volume."""
+    name = cfg.pattern.format(date=date_str, token=token, disk=v.diskno, part=v.partno)
+    return name, cfg.spool_dir / name, Path("/mnt") / "docrip" / name
+
+
+def lost_volume(
+    cfg: Config, v: Volume, token: str, date_str: str, err: BaseException, dry: bool
+) -> VolumeResult:
+    """Result for a volume whose worker process died (OOM kill, crash in C code)."""
+    name, _, mp = volume_paths(cfg, v, token, date_str)
+    umount(mp, dry=dry)  # the dead worker never reached its finally
+    return VolumeResult(
+        v.path,
+        v.fstype,
+        v.size_bytes,
+        name,
+        str(mp),
+        "exception",
+        0.0,
+        error=f"worker died: {err}",
+    )
 
 
 def process_one(
-    cfg: Config, v: Volume, token: str, date_str: str, comp_threads_job: int, dry=False
+    cfg: Config,
+    v: Volume,
+    token: str,
+    date_str: str,
+    comp_threads_job: int,
+    dry=False,
+    workers: int = 1,
 ) -> VolumeResult:
-    name = cfg.pattern.format(date=date_str, token=token, disk=v.diskno, part=v.partno)
-    work_root = cfg.spool_dir / name
-    mp = Path("/mnt") / "docrip" / name
-    started = time.time()
-    status = "ok"
-    error = None
-    try:
-        if not mount_ro(v, mp, dry=dry):
-            status = "mount_failed"
-            return VolumeResult(
-                v.path,
-                v.fstype,
-                v.size_bytes,
-                name,
-                str(mp),
-                status,
-                round(time.time() - started, 2),
-            )
-        ok = make_chunks(
-            cfg, mp, work_root, compressor_threads=comp_threads_job, dry=dry
-        )
-        if not ok:
-            status = "chunk_failed"
-            return VolumeResult(
-                v.path,
-                v.fstype,
-                v.size_bytes,
-                name,
-                str(mp),
-                status,
-                round(time.time() - started, 2),
-            )
-        ok2 = rsync_dir(cfg, work_root, date_str, token, dry=dry)
-        status = "ok" if ok2 else "rsync_failed"
-        return VolumeResult(
-            v.path,
-            v.fstype,
-            v.size_bytes,
-            name,
-            str(mp),
-            status,
-            round(time.time() - started, 2),
-        )
-    except Exception as e:
-        status = "exception"
-        error = str(e)
+    """Mount, archive and upload one volume; `workers` volumes run concurrently."""
+    name, work_root, mp = volume_paths(cfg, v, token, date_str)
+    started = time.monotonic()  # durations must not jump with NTP adjustments
+
+    def mk(status: str, error: str | None = None) -> VolumeResult:
         return VolumeResult(
             v.path,
             v.fstype,
@@ -103,13 +113,78 @@ def process_one(
             name,
             str(mp),
             status,
-            round(time.time() - started, 2),
+            round(time.monotonic() - started, 2),
             error=error,
         )
+
+    try:
+        if not mount_ro(v, mp, dry=dry):
+            return mk("mount_failed")
+        ok = make_chunks(
+            cfg,
+            mp,
+            work_root,
+            compressor_threads=comp_threads_job,
+            dry=dry,
+            fstype=v.fstype,
+        )
+        if not ok:
+            return mk("chunk_failed")
+        ok2 = rsync_dir(cfg, work_root, date_str, token, dry=dry, workers=workers)
+        return mk("ok" if ok2 else "rsync_failed")
+    except Exception as e:
+        return mk("exception", str(e))
     finally:
         umount(mp, dry=dry)
 
 
+def process_all(
+    cfg: Config,
+    to_process: List[Volume],
+    workers_override: int | None,
+    token: str,
+    date_str: str,
+    dry: bool,
+) -> List[VolumeResult]:
+    """Run process_one for every volume in the worker pool; results in completion order."""
+    workers = auto_workers(
+        workers_override if workers_override is not None else cfg.workers
+    )
+    # Never run more pipelines than volumes, so idle slots don't starve the
+    # compressors of cores (N independent zstd streams scale ~linearly).
+    workers = max(1, min(workers, len(to_process)))
+    comp_thr = comp_threads_for(workers)
+    print(
+        f"[info] workers={workers} comp_threads/job≈{comp_thr} date={date_str} token={token}"
+    )
+
+    results: List[VolumeResult] = []
+    # On Ctrl-C the queued volumes are cancelled, so nothing new gets mounted;
+    # running ones see their children die with the process group and unmount
+    # in finally. A worker process that dies breaks the pool: its volume and
+    # every one still pending are recorded as exceptions, the rest keep their
+    # results and the run summary is still written.
+    start_master(cfg, dry=dry, workers=workers)
+    ex = make_executor(cfg, workers)
+    try:
+        futs = {
+            ex.submit(process_one, cfg, v, token, date_str, comp_thr, dry, workers): v
+            for v in to_process
+        }
+        for f in concurrent.futures.as_completed(futs):
+            try:
+                results.append(f.result())
+            except concurrent.futures.BrokenExecutor as e:
+                results.append(lost_volume(cfg, futs[f], token, date_str, e, dry))
+    except BaseException:
+        ex.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        ex.shutdown()
+        stop_master(cfg, dry=dry, workers=workers)
+    return results
+
+
 def run_plan(
     cfg: Config,
     only: set[str] | None,
@@ -122,27 +197,13 @@ def run_plan(
     # Check for optional tools once and provide helpful summary
     check_optional_tools()
 
-    # Only create directories if not in dry-run or list-only mode
-    if not dry and not list_only:
-        try:
-            ensure_dir(cfg.run_summary_dir)
-            ensure_dir(cfg.spool_dir)
-            ensure_dir(Path("/mnt/docrip"))
-        except PermissionError as e:
-            print(f"❌ Error: {e}")
-            print(f"💡 Hint: This requires root permissions. Try: sudo {' '.join(sys.argv)}")
-            return 1
-        except OSError as e:
-            print(f"❌ Error: {e}")
-            print(f"💡 Hint: Check disk space and filesystem permissions")
-            return 1
-
     date_str = utc_datestr(cfg.date_fmt)
     token = derive_token(cfg, date_str)
 
     try:
         assemble_layers(cfg.allow_raid, cfg.allow_lvm, dry=dry)
-        vols = collect_volumes(cfg)
+        state = gather_state(with_blkid=cfg.skip_if_encrypted)
+        vols = collect_volumes(cfg, state)
     except RuntimeError as e:
         if "lsblk" in str(e):
             print(f"❌ Error: {e}")
@@ -161,43 +222,63 @@ def run_plan(
         return 0
 
     to_process: List[Volume] = [v for v in vols if not v.skip_reason]
-    to_process.sort(key=lambda x: x.size_bytes, reverse=True)
+    # Largest first: each idle worker takes the biggest remaining volume, i.e.
+    # greedy LPT scheduling, so the longest job never starts last.
+    to_process.sort(key=attrgetter("size_bytes"), reverse=True)
 
-    workers = auto_workers(
-        workers_override if workers_override is not None else cfg.workers
-    )
-    comp_thr = comp_threads_for(workers)
-    print(
-        f"[info] workers={workers} comp_threads/job≈{comp_thr} date={date_str} token={token}"
-    )
+    # Spool and mount roots are only needed when there is work (the summary
+    # writer creates run_summary_dir itself); dry runs touch nothing.
+    if not dry and to_process:
+        try:
+            ensure_dir(cfg.run_summary_dir)
+            ensure_dir(cfg.spool_dir)
+            ensure_dir(Path("/mnt/docrip"))
+        except PermissionError as e:
+            print(f"❌ Error: {e}")
+            print(f"💡 Hint: This requires root permissions. Try: sudo {' '.join(sys.argv)}")
+            return 1
+        except OSError as e:
+            print(f"❌ Error: {e}")
+            print(f"💡 Hint: Check disk space and filesystem permissions")
+            return 1
 
     results: List[VolumeResult] = []
-    start = time.time()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
-        futs = [
-            ex.submit(process_one, cfg, v, token, date_str, comp_thr, dry)
-            for v in to_process
-        ]
-        for f in concurrent.futures.as_completed(futs):
-            results.append(f.result())
+    started_utc = datetime.now(timezone.utc).isoformat()
+    start = time.monotonic()
+    if to_process:
+        results = process_all(cfg, to_process, workers_override, token, date_str, dry)
+    else:
+        print("[info] no volumes to process")
 
     run_summary = {
-        "started_utc": datetime.now(timezone.utc).isoformat(),
-        "duration_sec": round(time.time() - start, 2),
+        "started_utc": started_utc,
+        "duration_sec": round(time.monotonic() - start, 2),
         "host": os.uname().nodename,
         "date": date_str,
         "token": token,
         "volumes_total": len(vols),
         "volumes_processed": len(to_process),
-        "results": [r.__dict__ for r in results],
+        "results": results,  # write_json serializes the dataclasses
     }
-    ts = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    ts = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    if dry:
+        print(f"[dry-run] write run summary {cfg.run_summary_dir / f'run-{ts}.json'}")
+        return 0
     try:
-        write_json(cfg.run_summary_dir / f"run-{ts}.json", run_summary)
+        # compact: these are machine-read; `jq .` pretty-prints them
+        write_json(cfg.run_summary_dir / f"run-{ts}.json", run_summary, pretty=False)  # ensures the dir
         
-        if cfg.per_volume_json:
+        if cfg.per_volume_json and cfg.per_volume_json_format == "jsonl":
+            write_jsonl(cfg.run_summary_dir / f"volumes-{ts}.jsonl", results, parent_ok=True)
+        elif cfg.per_volume_json:
             for r in results:
-                write_json(cfg.run_summary_dir / f"{r.name}.json", r.__dict__)
+                write_json(
+                    cfg.run_summary_dir / f"{r.name}.json",
+                    r,
+                    atomic=False,
+                    parent_ok=True,
+                    pretty=False,
+                )
                 
     except PermissionError as e:
         print(f"❌ Error writing log files: {e}")
@@ -0,0 +1,105 @@
+"""
+scanner.py
+In-process file enumeration with os.scandir, replacing the find(1) process.
+Selection matches build_find_cmd's find expression:
+  - directories and symlinks always, regular files under max_file_size
+    (find's -size -NM: size rounded up to whole MiB), nothing else
+  - never descends into other filesystems (-xdev)
+DirEntry exposes the getdents64 d_type, so only directories (for st_dev) and,
+with a size limit, regular files are stat'ed; find lstat()s every entry.
+"""
+
+from __future__ import annotations
+import os, threading
+from pathlib import Path
+from typing import Callable, Iterator
+
+MIB = 1024 * 1024
+FEED_BUFFER = 1024 * 1024  # batch small path writes into pipe-sized chunks
+
+
+def iter_paths(
+    root: Path, max_mb: int = 0, on_error: Callable[[OSError], None] | None = None
+) -> Iterator[bytes]:
+    """
+    Yield paths relative to `root` in find's spelling (b".", b"./etc", ...).
+    Unreadable directories are passed to `on_error` and skipped, as find does.
+    Uses an explicit stack, so deep trees cannot hit the recursion limit.
+    """
+
+    def error(e: OSError) -> None:
+        if on_error is not None:
+            on_error(e)
+
+    top = os.fsencode(root)
+    try:
+        root_dev = os.lstat(top).st_dev
+    except OSError as e:
+        error(e)
+        return
+    limit = max_mb if max_mb and max_mb > 0 else 0
+    yield b"."
+    stack = [(top, b".")]
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        try:
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    rel = rel_dir + b"/" + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            yield rel
+                            if entry.stat(follow_symlinks=False).st_dev == root_dev:
+                                stack.append((entry.path, rel))
+                        elif entry.is_symlink():
+                            yield rel
+                        elif entry.is_file(follow_symlinks=False):
+                            if not limit:
+                                yield rel
+                                continue
+                            size = entry.stat(follow_symlinks=False).st_size
+                            if -(-size // MIB) < limit:  # find rounds up to whole MiB
+                                yield rel
+                    except OSError as e:  # vanished or unreadable entry
+                        error(e)
+        except OSError as e:  # unreadable directory
+            error(e)
+
+
+class Scan:
+    """
+    A scandir walk of `root`, usable wherever the find command string is:
+    str() describes it for dry runs, paths() feeds libarchive directly and
+    feed() writes the NUL-separated list into tar's stdin pipe.
+    """
+
+    def __init__(self, root: Path, max_mb: int = 0):
+        self.root = root
+        self.max_mb = max_mb
+        self.errors = 0
+
+    def __str__(self) -> str:
+        size = f" -size -{self.max_mb}M" if self.max_mb and self.max_mb > 0 else ""
+        return f"<scandir {self.root} -xdev{size}>"
+
+    def _error(self, e: OSError) -> None:
+        self.errors += 1
+        print(f"[warn] scan: {e}")
+
+    def paths(self) -> Iterator[bytes]:
+        return iter_paths(self.root, self.max_mb, self._error)
+
+    def feed(self, fd: int) -> threading.Thread:
+        """Write the list to `fd` (taking ownership) from a background thread."""
+
+        def writer() -> None:
+            try:
+                with os.fdopen(fd, "wb", buffering=FEED_BUFFER) as f:
+                    for p in self.paths():
+                        f.write(p + b"\0")
+            except BrokenPipeError:
+                pass  # tar exited early; _stream reports its status
+
+        t = threading.Thread(target=writer, name=f"scan:{self.root}", daemon=True)
+        t.start()
+        return t
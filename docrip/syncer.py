@@ -2,22 +2,182 @@
 syncer.py
 Rsync directory (containing chunk files and manifests) to the remote server.
 Uses --partial --inplace --append-verify --mkpath for resilient resume semantics.
+The files are bin-packed by size into buckets (msrsync-style) and each bucket
+gets its own rsync/SSH stream. runtime.rsync_parallel and rsync_bwlimit_kbps
+are budgets for the whole run, shared by the volumes uploading at once.
+With server.ssh_multiplex and a single stream for the run (one worker, one
+stream), run_plan opens one OpenSSH ControlMaster (start_master/stop_master)
+and every rsync's ssh rides on it: no handshake or key exchange per volume.
+Concurrent streams each open their own connection instead: a shared master
+would funnel them all through one TCP connection and one ssh cipher process.
 """
 
 from __future__ import annotations
-import shlex
+import concurrent.futures, heapq, os, shlex, tempfile
 from pathlib import Path
+from typing import List, Sequence
 from .types import Config
-from .util import run, ensure_dir
+from .util import run, ensure_dir, clamp, CPU_COUNT
+
+CONTROL_PATH = "/tmp/docrip-ssh-%C"  # %C: hash of (local host, remote host, port, user)
+CONTROL_PERSIST = "600"
+
+
+def multiplexed(cfg: Config, workers: int = 1) -> bool:
+    """Whether rsync uses the shared master: only when one stream runs at a time."""
+    return cfg.ssh_multiplex and workers * rsync_streams(cfg, workers) == 1
+
+
+def ssh_args(cfg: Config, mux: bool, control_master: str = "auto") -> List[str]:
+    """
+    ssh options shared by rsync's -e and the control master. The port must be
+    the same everywhere: %C hashes it, so it picks the socket.
+    """
+    args = ["-i", cfg.server_ssh_key, "-p", str(cfg.server_port)]
+    if mux:
+        opts = (
+            f"ControlMaster={control_master}",  # ssh keeps the first value given
+            f"ControlPath={CONTROL_PATH}",
+            f"ControlPersist={CONTROL_PERSIST}",
+        )
+        for opt in opts:
+            args += ["-o", opt]
+    return args
+
+
+def _ssh_host(remote: str) -> str | None:
+    """[user@]host of an rsync-over-ssh remote (user@host:/path); None otherwise."""
+    if not remote or remote.startswith("rsync://") or "::" in remote:
+        return None
+    host, sep, _ = remote.partition(":")
+    return host if sep and "/" not in host else None
+
+
+def start_master(cfg: Config, dry: bool = False, workers: int = 1) -> bool:
+    """Open the shared SSH connection in the background; rsync works without it."""
+    host = _ssh_host(cfg.server_rsync_remote)
+    if not multiplexed(cfg, workers) or host is None:
+        return False
+    master = ssh_args(cfg, mux=True, control_master="yes")
+    rc, _ = run(["ssh", *master, "-Nf", host], dry=dry)
+    if rc != 0:
+        print(
+            f"[warn] could not open shared SSH connection to {host};"
+            " rsync will connect per stream"
+        )
+    return rc == 0
+
+
+def stop_master(cfg: Config, dry: bool = False, workers: int = 1) -> None:
+    host = _ssh_host(cfg.server_rsync_remote)
+    if multiplexed(cfg, workers) and host is not None:
+        exit_cmd = ["ssh", *ssh_args(cfg, mux=True), "-O", "exit", host]
+        run(exit_cmd, capture=True, dry=dry)
+
+
+def rsync_streams(cfg: Config, workers: int = 1) -> int:
+    """
+    Streams per volume: runtime.rsync_parallel (0 = auto: half the CPUs, max 8)
+    caps the run, so `workers` concurrent volumes split it (at least one each).
+    """
+    total = (
+        cfg.rsync_parallel if cfg.rsync_parallel > 0 else clamp(1, CPU_COUNT // 2, 8)
+    )
+    return max(1, total // max(1, workers))
+
+
+def stream_bwlimit(cfg: Config, streams: int) -> int:
+    """Per-stream --bwlimit so `streams` concurrent rsyncs together honour the cap."""
+    if cfg.rsync_bwlimit_kbps <= 0:
+        return 0
+    return max(1, cfg.rsync_bwlimit_kbps // max(1, streams))
+
+
+def bucket_files(local_dir: Path, n: int) -> List[List[str]]:
+    """Greedy largest-first bin packing of the directory's files into <= n buckets."""
+    sizes = sorted(
+        ((e.stat().st_size, e.name) for e in os.scandir(local_dir) if e.is_file()),
+        reverse=True,
+    )
+    heap = [(0, i) for i in range(min(n, len(sizes)))]
+    buckets: List[List[str]] = [[] for _ in heap]
+    for size, name in sizes:
+        total, i = heapq.heappop(heap)
+        buckets[i].append(name)
+        heapq.heappush(heap, (total + size, i))
+    return buckets
+
+
+def rsync_cmd(
+    cfg: Config,
+    local_dir: Path,
+    dest: str,
+    bwlimit_kbps: int,
+    extra: Sequence[str] = (),
+    mux: bool = False,
+) -> List[str]:
+    """rsync argv (list form: exec'd directly, no shell wrapper)."""
+    bw = [f"--bwlimit={bwlimit_kbps}"] if bwlimit_kbps > 0 else []
+    return [
+        "rsync",
+        "-r",
+        *bw,
+        *extra,
+        "--partial",
+        "--inplace",
+        "--append-verify",
+        "--mkpath",
+        "-e",
+        shlex.join(["ssh", *ssh_args(cfg, mux)]),  # rsync splits -e itself
+        f"{local_dir}/",
+        dest,
+    ]
+
+
+def _rsync(cfg: Config, cmd: List[str], dry: bool = False) -> int:
+    """Run rsync; its output is only shown with log_level DEBUG or on failure."""
+    rc, err = run(cmd, dry=dry, quiet=cfg.log_level != "DEBUG")
+    if rc != 0 and err:
+        print(f"[warn] rsync exited rc={rc}:\n{err.rstrip()}")
+    return rc
 
 
 def rsync_dir(
-    cfg: Config, local_dir: Path, date_str: str, token: str, dry: bool = False
+    cfg: Config,
+    local_dir: Path,
+    date_str: str,
+    token: str,
+    dry: bool = False,
+    workers: int = 1,
 ) -> bool:
+    """Upload `local_dir`; `workers` is how many volumes upload concurrently."""
     dest = f"{cfg.server_rsync_remote}/{date_str}/{token}/"
-    ensure_dir(local_dir)
-    ssh_opt = f"-i {shlex.quote(cfg.server_ssh_key)} -p {cfg.server_port}"
-    bw = f"--bwlimit={cfg.rsync_bwlimit_kbps}" if cfg.rsync_bwlimit_kbps > 0 else ""
-    cmd = f'rsync -r {bw} --partial --inplace --append-verify --mkpath -e "ssh {ssh_opt}" {shlex.quote(str(local_dir))}/ {shlex.quote(dest)}'
-    rc, _ = run(cmd, dry=dry)
-    return rc == 0
+    if not dry:
+        ensure_dir(local_dir)
+    n = rsync_streams(cfg, workers)
+    mux = multiplexed(cfg, workers)
+    buckets = bucket_files(local_dir, n) if n > 1 and not dry else []
+    if len(buckets) < 2:
+        bw = stream_bwlimit(cfg, workers)
+        return _rsync(cfg, rsync_cmd(cfg, local_dir, dest, bw, mux=mux), dry) == 0
+
+    # every stream of every volume in flight shares the run's bandwidth cap
+    per = stream_bwlimit(cfg, workers * len(buckets))
+
+    def send(names: List[str]) -> int:
+        # the list lives outside local_dir so it is never uploaded itself
+        with tempfile.NamedTemporaryFile(
+            "wb", prefix="docrip-rsync-", suffix=".list"
+        ) as lst:
+            lst.write(b"".join(os.fsencode(nm) + b"\0" for nm in names))
+            lst.flush()
+            extra = [f"--files-from={lst.name}", "--from0"]
+            return _rsync(cfg, rsync_cmd(cfg, local_dir, dest, per, extra, mux))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(buckets)) as ex:
+        rcs = list(ex.map(send, buckets))
+    failed = [rc for rc in rcs if rc != 0]
+    if failed:
+        n_failed = f"{len(failed)}/{len(rcs)}"
+        print(f"[warn] {n_failed} rsync stream(s) failed for {local_dir.name}")
+    return not failed
@@ -1,17 +1,33 @@
 """
 types.py
-Dataclasses used across modules: Config, Volume, VolumeResult.
+Dataclasses used across modules: Config, Volume, DiscoveryState, VolumeResult.
 
 These are intentionally lightweight, serializable, and stable for logging.
+All of them use slots (no per-instance __dict__); write_json serializes
+them field by field.
+The archive stream's protocols live here too: Hasher (hashlib or blake3
+objects) and ByteSink (an open file or a ChunkWriter).
 """
 
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Protocol, Union
 
+Bytes = Union[bytes, bytearray, memoryview]
 
-@dataclass
+
+class Hasher(Protocol):
+    def update(self, data: Bytes, /) -> object: ...
+
+    def hexdigest(self) -> str: ...
+
+
+class ByteSink(Protocol):
+    def write(self, data: Bytes, /) -> int: ...
+
+
+@dataclass(slots=True)
 class Config:
     # server
     server_rsync_remote: str
@@ -46,9 +62,22 @@ class Config:
     integrity_algo: str
     run_summary_dir: Path
     per_volume_json: bool
+    # tuning (optional; defaults keep older configs loadable)
+    zstd_adapt: bool = False
+    multi_frame: bool = True
+    tar_impl: str = "auto"  # "auto" | "gnu" | "bsd"
+    drop_page_cache: bool = True
+    inline_archive: bool = False
+    scanner: str = "auto"  # "auto" | "find" | "python"
+    merkle_whole: bool = False
+    rsync_parallel: int = 0  # 0 = auto (workers, max 8)
+    ssh_multiplex: bool = True
+    token_source_hash: str = "sha256"  # "sha256" | "blake2b" (changes every token)
+    per_volume_json_format: str = "files"  # "files" | "jsonl"
+    executor: str = "process"  # "process" | "thread"
 
 
-@dataclass
+@dataclass(slots=True)
 class Volume:
     path: str
     kname: str
@@ -56,7 +85,8 @@ class Volume:
     size_bytes: int
     type: str
     uuid: Optional[str]
-    encrypted: bool
+    # None: not probed (already skipped, or skip_if_encrypted off)
+    encrypted: Optional[bool]
     diskno: int
     partno: int
     model: Optional[str]
@@ -64,7 +94,17 @@ class Volume:
     skip_reason: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
+class DiscoveryState:
+    """Block-device snapshot taken once per plan; every lookup reads from it."""
+
+    lsblk_tree: Dict[str, Any]
+    parent_of: Dict[str, Tuple[str, str, str]]  # kname -> (name, type, pkname)
+    blkid_by_dev: Dict[str, Dict[str, str]]  # DEVNAME -> blkid tags
+    mounts: Dict[str, str]  # mount target -> source
+
+
+@dataclass(slots=True)
 class VolumeResult:
     device: str
     fstype: str
@@ -1,25 +1,44 @@
 """
 util.py
 Cross-cutting utilities:
-- Process execution (list-of-args or bash -lc string) with dry-run support
+- Process execution (list-of-args, or sh -c / bash -lc string) with dry-run support
 - PATH helper (checked in bundle.py)
-- Small helpers: clamp, time/host, JSON writing, token derivation
+- Small helpers: clamp, time/host, JSON writing (orjson when installed), token derivation
 """
 
 from __future__ import annotations
-import hashlib, json, os, re, shlex, shutil, subprocess, sys
+import dataclasses, hashlib, json, os, re, shlex, shutil, subprocess, sys
+from collections import deque
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
+try:  # optional: faster JSON serializer (pip install orjson)
+    import orjson
+except ImportError:  # pragma: no cover - depends on the build environment
+    orjson = None  # type: ignore[assignment]
 
-def run(cmd, check=True, capture=False, env=None, dry=False):
+
+_BASHISMS = (">(", "<(", "|&")
+QUIET_TAIL_LINES = 1024  # stderr lines a quiet run keeps for its failure report
+
+
+def run(cmd, check=True, capture=False, env=None, dry=False, shell=None, quiet=False):
     """
     Execute a command.
-    - If cmd is a string, run via /bin/bash -lc (required for process substitution like tee >()).
+    - A list is exec'd directly, without any shell.
+    - A string runs via /bin/sh -c, or via /bin/bash -lc when it needs bash
+      (process substitution like tee >(), |&) or shell=True forces it; bash -l
+      sources the login profile, which costs tens of ms per call.
+    - quiet: stdout goes to /dev/null and only the last QUIET_TAIL_LINES of
+      stderr are kept, returned as output when the command fails (a chatty
+      child writing to a slow terminal is throttled by it).
     - Returns (rc, output_str).
     """
     if isinstance(cmd, str):
-        cmd_list = ["/bin/bash", "-lc", cmd]
+        if shell is None:
+            shell = any(b in cmd for b in _BASHISMS)
+        cmd_list = ["/bin/bash", "-lc", cmd] if shell else ["/bin/sh", "-c", cmd]
     else:
         cmd_list = cmd
     if dry:
@@ -32,6 +51,14 @@ def run(cmd, check=True, capture=False, env=None, dry=False):
         if capture:
             out = subprocess.check_output(cmd_list, stderr=subprocess.STDOUT, env=env)
             return 0, out.decode("utf-8", "replace")
+        elif quiet:
+            p = subprocess.Popen(
+                cmd_list, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env
+            )
+            with p.stderr:
+                tail = deque(p.stderr, maxlen=QUIET_TAIL_LINES)
+            rc = p.wait()
+            return rc, b"".join(tail).decode("utf-8", "replace") if rc else ""
         else:
             rc = subprocess.call(cmd_list, env=env)
             return rc, ""
@@ -85,6 +112,13 @@ def check_optional_tools() -> None:
             print(f"💡 For APFS support: see https://github.com/sgan81/apfs-fuse for manual installation")
 
 
+# CPUs this process may run on: sched_getaffinity honours taskset/cpusets
+# (containers), where os.cpu_count() reports every host CPU. Read once.
+CPU_COUNT = (
+    len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 2)
+)
+
+
 def clamp(lo, x, hi):
     return max(lo, min(x, hi))
 
@@ -103,33 +137,120 @@ def ensure_dir(p: Path):
         raise OSError(f"Cannot create directory {p}: {e}")
 
 
-def write_json(path: Path, obj):
-    ensure_dir(path.parent)
+# orjson's native dataclass encoding ignores OPT_SORT_KEYS; passing dataclasses
+# through to _json_default keeps its output identical to the json fallback
+_ORJSON_OPTS = (
+    orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS if orjson is not None else 0
+)
+
+
+def _json_default(o):
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps_json(obj, pretty: bool = True) -> bytes:
+    """
+    Key-sorted JSON as bytes; dataclasses serialize as their fields.
+    Indented, or compact like dumps_json_line with pretty=False.
+    """
+    if not pretty:
+        return dumps_json_line(obj)
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=_ORJSON_OPTS | orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, sort_keys=True, default=_json_default).encode("utf-8")
+
+
+def write_json(
+    path: Path, obj, atomic: bool = True, parent_ok: bool = False, pretty: bool = True
+):
+    """
+    atomic: write <path>.tmp and rename over `path` (readers never see a partial
+    file). Otherwise write `path` in place and fdatasync it: one dirent instead
+    of two, for small per-volume files where a torn write after a crash is OK.
+    parent_ok: the caller already ensured path.parent (skip the mkdir per file).
+    pretty: indent for humans; pass False for machine-read files (jq . shows them).
+    """
+    if not parent_ok:
+        ensure_dir(path.parent)
+    data = dumps_json(obj, pretty)
+    if not atomic:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:  # os.write may write less than asked
+                view = view[os.write(fd, view) :]
+            os.fdatasync(fd)
+        finally:
+            os.close(fd)
+        return
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(json.dumps(obj, indent=2, sort_keys=True))
+    tmp.write_bytes(data)
     tmp.replace(path)
 
 
-def base36_digest5(s: str) -> str:
-    """Deterministic 5-char base36 token from sha256(s)."""
-    h = hashlib.sha256(s.encode("utf-8")).digest()
+def dumps_json_line(obj) -> bytes:
+    """Compact single-line JSON (for JSONL), dataclasses as their fields."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=_ORJSON_OPTS)
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=_json_default).encode(
+        "utf-8"
+    )
+
+
+def write_jsonl(path: Path, objs, parent_ok: bool = False) -> None:
+    """One JSON object per line in a single file, fdatasync'ed once."""
+    if not parent_ok:
+        ensure_dir(path.parent)
+    with open(path, "wb") as f:
+        for o in objs:
+            f.write(dumps_json_line(o) + b"\n")
+        f.flush()
+        os.fdatasync(f.fileno())
+
+
+BASE36_CHARS = b"0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def base36_digest5(s: str, algo: str = "sha256") -> str:
+    """
+    Deterministic 5-char base36 token from the first 8 bytes of sha256(s), or
+    of an 8-byte blake2b(s) with algo="blake2b". Tokens end up in remote paths,
+    so the default must stay sha256 for existing installs.
+    """
+    if algo == "blake2b":
+        h = hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest()
+    elif algo == "sha256":
+        h = hashlib.sha256(s.encode("utf-8")).digest()
+    else:
+        raise ValueError(f"Unsupported token hash: {algo}")
     n = int.from_bytes(h[:8], "big")
-    chars = "0123456789abcdefghijklmnopqrstuvwxyz"
-    out = []
-    for _ in range(6):
-        out.append(chars[n % 36])
-        n //= 36
-    return "".join(out)[:5]
+    out = bytearray(5)
+    for i in range(5):  # least significant digit first
+        n, r = divmod(n, 36)
+        out[i] = BASE36_CHARS[r]
+    return out.decode("ascii")
 
 
+@lru_cache(maxsize=4)
 def host_identifier(prefer: str = "machine-id") -> str:
-    """Return a stable identifier for the current machine (machine-id, DMI UUID, or hostname)."""
+    """
+    Return a stable identifier for the current machine (machine-id, DMI UUID, or hostname).
+    Cached per `prefer`: none of these change during a run.
+    """
     if prefer == "machine-id":
-        for p in (Path("/etc/machine-id"), Path("/sys/class/dmi/id/product_uuid")):
+        for p in ("/etc/machine-id", "/sys/class/dmi/id/product_uuid"):
+            try:
+                fd = os.open(p, os.O_RDONLY)
+            except OSError:
+                continue
             try:
-                s = p.read_text().strip()
-                if s:
-                    return s
-            except:
-                pass
+                s = os.read(fd, 64).decode("ascii", "replace").strip()  # 32 hex / 36-char UUID
+            except OSError:
+                s = ""
+            finally:
+                os.close(fd)
+            if s:
+                return s
     return os.uname().nodename
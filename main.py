@@ -8,6 +8,11 @@ from pathlib import Path
 
 # Add the project root to Python path for development mode
 if __name__ == "__main__":
+    # Volume workers run in a forkserver process pool; needed in the PyInstaller bundle
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+
     # Get the directory containing this script
     script_dir = Path(__file__).resolve().parent
 
@@ -53,6 +53,18 @@ print(f"[ok] Python {sys.version.split()[0]}")
 PY
 }
 
+smoke_import() {
+  # catch a truncated or shadowed module (e.g. a stripped-down cli.py) before bundling
+  python3 - <<'PY'
+import docrip, docrip.cli
+for name in docrip.__all__:
+    __import__(f"docrip.{name}")
+assert hasattr(docrip.cli, "validate_arguments"), "docrip.cli lost validate_arguments"
+assert hasattr(docrip.cli, "check_root_access"), "docrip.cli lost check_root_access"
+print("[ok] docrip modules import")
+PY
+}
+
 ensure_pyinstaller() {
   if ! python3 -c 'import PyInstaller' >/dev/null 2>&1; then
     echo "[*] Installing PyInstaller for build-time (user scope)"
@@ -83,13 +95,20 @@ version = 1
 rsync_remote = "backup@datavault.example:/srv/docrip"
 ssh_key      = "/root/.ssh/docrip_ed25519"
 port         = 22
+ssh_multiplex = true
 [archive]
 compressor = "zstd"
 compression_level = 3
 chunk_size_mb = 4096
 stream_direct = false
 spool_dir = "/var/tmp/docrip"
+drop_page_cache = true
 preserve_xattrs = true
+zstd_adapt = false
+multi_frame = true
+tar_impl = "auto"
+inline_archive = false
+scanner = "auto"
 [discovery]
 include_fstypes = ["ext2","ext3","ext4","xfs","btrfs","zfs","ntfs","vfat","exfat","hfs","hfsplus","apfs"]
 skip_fstypes = ["swap","iso9660","udf","crypto_LUKS"]
@@ -103,16 +122,21 @@ max_file_size_mb = 100
 [runtime]
 workers = 0
 rsync_bwlimit_kbps = 0
+rsync_parallel = 0
+executor = "process"
 log_level = "INFO"
 [naming]
 date_fmt = "%Y%m%d"
 token_source = "machine-id"
+token_source_hash = "sha256"
 pattern = "{date}_{token}_d{disk}_p{part}"
 [integrity]
 algorithm = "sha256"
+merkle_whole = false
 [output]
 run_summary_dir = "/var/log/docrip"
 per_volume_json = true
+per_volume_json_format = "files"
 EOF
   echo "[ok] wrote demo docrip.toml"
 }
@@ -121,6 +145,7 @@ do_build() {
   check_python311
   ensure_pyinstaller
   [ -f "${ENTRY}" ] || die "Missing ${ENTRY}"
+  smoke_import
 
   # Include docrip.toml as in-bundle default (can be overridden by adjacent or /etc)
   pyinstaller --clean --noconfirm \
@@ -136,6 +161,8 @@ do_build() {
     --hidden-import "docrip.mounter" \
     --hidden-import "docrip.archiver" \
     --hidden-import "docrip.chunker" \
+    --hidden-import "docrip.inline_chunker" \
+    --hidden-import "docrip.scanner" \
     --hidden-import "docrip.syncer" \
     --hidden-import "docrip.layers" \
     --hidden-import "docrip.util" \
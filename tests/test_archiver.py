@@ -3,6 +3,7 @@ Tests for archiver module.
 """
 import pytest
 from pathlib import Path
+from docrip import archiver
 from docrip.archiver import build_find_cmd, compressor_cmd
 from docrip.types import Config
 
@@ -33,16 +34,70 @@ def test_build_find_cmd_no_size_limit():
     assert "-type f -print0" in cmd
 
 
+def test_build_find_cmd_prefers_scan_helper(monkeypatch):
+    """Test the native scanner replaces find when it is available."""
+    monkeypatch.setattr("docrip.archiver._have_tool", lambda name: name == "docrip-scan")
+    
+    assert build_find_cmd(Path("/mnt/test"), 100) == "docrip-scan --root /mnt/test --max-size 100M --print0"
+    assert build_find_cmd(Path("/mnt/test"), 0) == "docrip-scan --root /mnt/test --print0"
+
+
 def test_compressor_cmd_zstd():
     """Test zstd compressor command generation."""
     # Create a minimal config
     config = type('Config', (), {
         'compressor': 'zstd',
-        'compression_level': 5
+        'compression_level': 5,
+        'zstd_adapt': True,
+        'multi_frame': False
     })()
     
     cmd = compressor_cmd(config, 4)
-    assert cmd == "zstd -T4 -5"
+    assert cmd == "zstd -T4 --long=27 -5 --adapt"
+
+
+def test_compressor_cmd_zstd_no_adapt():
+    """Test zstd keeps the long window when --adapt is disabled."""
+    config = type('Config', (), {
+        'compressor': 'zstd',
+        'compression_level': 3,
+        'zstd_adapt': False,
+        'multi_frame': False
+    })()
+    
+    cmd = compressor_cmd(config, 2)
+    assert cmd == "zstd -T2 --long=27 -3"
+
+
+def test_compressor_cmd_pzstd(monkeypatch):
+    """Test multi-frame output uses pzstd only when it is installed."""
+    config = type('Config', (), {
+        'compressor': 'zstd',
+        'compression_level': 3,
+        'zstd_adapt': True,
+        'multi_frame': True
+    })()
+    
+    monkeypatch.setattr("docrip.archiver._have_tool", lambda name: name == "pzstd")
+    assert compressor_cmd(config, 4) == "pzstd -p 4 -3 -c"
+    
+    monkeypatch.setattr("docrip.archiver._have_tool", lambda name: False)
+    assert compressor_cmd(config, 4) == "zstd -T4 --long=27 -3 --adapt"
+
+
+def test_tool_lookup_cached(monkeypatch):
+    """Test PATH is searched once per tool, not once per volume."""
+    lookups = []
+    monkeypatch.setattr("docrip.archiver.which_quiet", lambda name: lookups.append(name) or True)
+    archiver._have_tool.cache_clear()
+    config = type('Config', (), {'compressor': 'zstd', 'compression_level': 3, 'multi_frame': True})()
+
+    assert compressor_cmd(config, 4) == compressor_cmd(config, 2).replace("-p 2", "-p 4")
+    build_find_cmd(Path("/mnt/a"), 0)
+    build_find_cmd(Path("/mnt/b"), 0)
+    archiver._have_tool.cache_clear()
+
+    assert lookups == ["pzstd", "docrip-scan"]
 
 
 def test_compressor_cmd_pigz():
@@ -0,0 +1,210 @@
+"""
+Tests for chunker module.
+"""
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from docrip.chunker import (
+    ChunkWriter,
+    _stream,
+    make_chunks,
+    new_hasher,
+    pick_tar,
+    tar_args,
+    wants_xattrs,
+)
+from docrip.scanner import Scan
+
+
+def test_stream_copies_and_hashes():
+    """Test the compressed stream is copied through and hashed in-process."""
+    out = io.BytesIO()
+    digest = _stream("printf 'hello world'", ["cat"], ["cat"], out, "sha256")
+
+    assert out.getvalue() == b"hello world"
+    assert digest == hashlib.sha256(b"hello world").hexdigest()
+
+
+def test_stream_compressor_failure_returns_none():
+    """Test a failing compressor stage reports no digest."""
+    out = io.BytesIO()
+    assert _stream("printf 'partial'", ["cat"], ["false"], out, "sha256") is None
+
+
+def test_stream_tar_warning_is_not_fatal():
+    """Test tar rc=1 (files changed while reading) still yields a digest."""
+    out = io.BytesIO()
+    tar = ["sh", "-c", "cat; exit 1"]
+    assert _stream("printf 'x'", tar, ["cat"], out, "sha256") is not None
+
+
+def test_stream_bsdtar_rc1_is_fatal(tmp_path):
+    """Test bsdtar rc=1 fails the stream: bsdtar uses 1 for fatal errors too."""
+    bsdtar = tmp_path / "bsdtar"
+    bsdtar.write_text("#!/bin/sh\ncat; exit 1\n")
+    bsdtar.chmod(0o755)
+    out = io.BytesIO()
+    assert _stream("printf 'x'", [str(bsdtar)], ["cat"], out, "sha256") is None
+
+
+def test_stream_from_scan(tmp_path):
+    """Test an in-process Scan feeds tar's stdin in place of find."""
+    (tmp_path / "a").write_bytes(b"1")
+    out = io.BytesIO()
+    tar = ["tr", "\\0", "\\n"]
+    assert _stream(Scan(tmp_path), tar, ["cat"], out, "sha256") is not None
+    assert sorted(out.getvalue().split()) == [b".", b"./a"]
+
+
+def test_tar_args_no_recursion():
+    """Test tar does not recurse into directories named by the file list."""
+    args = tar_args(Path("/mnt/test"))
+
+    assert args[:3] == ["tar", "-C", "/mnt/test"]
+    assert "--no-recursion" in args
+    assert "--null" in args
+
+
+def test_chunk_writer_rotates_and_hashes(tmp_path):
+    """Test parts are cut at the boundary and each gets its own sidecar hash."""
+    data = bytes(range(256)) * 10  # 2560 bytes
+    writer = ChunkWriter(str(tmp_path / "vol.tar.zst.part"), 1000, "sha256")
+    writer.write(data[:700])
+    writer.write(data[700:])
+    writer.close()
+
+    assert [p.name for p in writer.parts] == [
+        "vol.tar.zst.part0000",
+        "vol.tar.zst.part0001",
+        "vol.tar.zst.part0002",
+    ]
+    assert b"".join(p.read_bytes() for p in writer.parts) == data
+    assert [len(p.read_bytes()) for p in writer.parts] == [1000, 1000, 560]
+    for p in writer.parts:
+        expected = hashlib.sha256(p.read_bytes()).hexdigest()
+        assert (tmp_path / f"{p.name}.sha256").read_text() == f"{expected}  {p.name}\n"
+
+
+def test_chunk_writer_exact_boundary(tmp_path):
+    """Test a stream ending on a chunk boundary leaves no empty trailing part."""
+    writer = ChunkWriter(str(tmp_path / "p"), 4, "sha256")
+    writer.write(b"abcdefgh")
+    writer.close()
+
+    assert [p.name for p in writer.parts] == ["p0000", "p0001"]
+
+
+def test_chunk_writer_sidecar_named_after_algorithm(tmp_path):
+    """Test the per-part sidecar extension follows the integrity algorithm."""
+    writer = ChunkWriter(str(tmp_path / "p"), 1024, "sha512")
+    writer.write(b"data")
+    writer.close()
+
+    sidecar = tmp_path / "p0000.sha512"
+    assert sidecar.read_text() == f"{hashlib.sha512(b'data').hexdigest()}  p0000\n"
+
+
+def test_new_hasher_blake3():
+    """Test BLAKE3 is available as an integrity algorithm when installed."""
+    blake3 = pytest.importorskip("blake3")
+    h = new_hasher("blake3")
+    h.update(b"abc")
+    assert h.hexdigest() == blake3.blake3(b"abc").hexdigest()
+
+
+def test_tar_args_bsdtar():
+    """Test bsdtar uses its own spelling of the no-recursion and xattr flags."""
+    args = tar_args(Path("/mnt/test"), "bsd")
+
+    assert args[:3] == ["bsdtar", "-C", "/mnt/test"]
+    assert "-n" in args
+    assert "--xattrs" in args
+    assert "--xattrs-include=*" not in args
+
+
+def test_pick_tar_falls_back_to_gnu(monkeypatch):
+    """Test a missing bsdtar falls back to GNU tar."""
+    monkeypatch.setattr("docrip.chunker.which_quiet", lambda name: False)
+    assert pick_tar("auto") == "gnu"
+    assert pick_tar("bsd") == "gnu"
+
+    monkeypatch.setattr("docrip.chunker.which_quiet", lambda name: True)
+    assert pick_tar("auto") == "bsd"
+    assert pick_tar("gnu") == "gnu"
+
+
+def test_tar_args_without_xattrs():
+    """Test xattr/ACL collection can be switched off for both tar flavours."""
+    gnu = tar_args(Path("/mnt/test"), "gnu", xattrs=False)
+    bsd = tar_args(Path("/mnt/test"), "bsd", xattrs=False)
+
+    assert not any(a.startswith("--xattrs") or a == "--acls" for a in gnu)
+    assert "--no-xattrs" in bsd and "--no-acls" in bsd
+
+
+def test_wants_xattrs_by_fstype(sample_config):
+    """Test xattrs are only requested on filesystems that carry them."""
+    assert wants_xattrs(sample_config, "ext4")
+    assert wants_xattrs(sample_config, None)
+    assert not wants_xattrs(sample_config, "vfat")
+    assert not wants_xattrs(sample_config, "exfat")
+
+    sample_config.preserve_xattrs = False
+    assert not wants_xattrs(sample_config, "ext4")
+
+
+def test_chunk_writer_drop_cache(tmp_path):
+    """Test evicting finished parts from the page cache keeps their contents."""
+    writer = ChunkWriter(str(tmp_path / "p"), 4, "sha256", drop_cache=True)
+    writer.write(b"abcdef")
+    writer.close()
+
+    assert [p.read_bytes() for p in writer.parts] == [b"abcd", b"ef"]
+
+
+def test_make_chunks_dry_run_touches_nothing(tmp_path, sample_config, capsys):
+    """Test a dry run only prints the pipeline and creates no spool directory."""
+    outdir = tmp_path / "spool" / "vol"
+    assert make_chunks(sample_config, Path("/mnt/test"), outdir, 1, dry=True)
+
+    assert not outdir.exists()
+    assert "[dry-run]" in capsys.readouterr().out
+
+
+def test_chunk_writer_background_hashing(tmp_path):
+    """Test background part hashing gives the same sidecars and Merkle digest."""
+    data = bytearray(range(256)) * 40
+    writer = ChunkWriter(str(tmp_path / "p"), 4096, "sha256", background=True)
+    for i in range(0, len(data), 1000):
+        writer.write(data[i : i + 1000])
+    writer.close()
+
+    assert b"".join(p.read_bytes() for p in writer.parts) == data
+    assert writer.digests == [hashlib.sha256(p.read_bytes()).hexdigest() for p in writer.parts]
+    lines = "".join(f"{d}\n" for d in writer.digests).encode()
+    assert writer.merkle_digest() == hashlib.sha256(lines).hexdigest()
+
+
+def test_stream_without_whole_hash():
+    """Test the stream can be copied without hashing it (Merkle mode)."""
+    out = io.BytesIO()
+    assert _stream("printf 'abc'", ["cat"], ["cat"], out, None) == ""
+    assert out.getvalue() == b"abc"
+
+
+def test_stream_buffer_ring_with_background_writer(tmp_path):
+    """Test reused read buffers never corrupt background part hashes."""
+    src = tmp_path / "src"
+    src.write_bytes(os.urandom(40 * 1024 * 1024 + 123))
+    writer = ChunkWriter(str(tmp_path / "p"), 3 * 1024 * 1024, "sha256", background=True)
+    digest = _stream(f"cat {src}", ["cat"], ["cat"], writer, "sha256")
+    writer.close()
+
+    data = src.read_bytes()
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert b"".join(p.read_bytes() for p in writer.parts) == data
+    assert writer.digests == [hashlib.sha256(p.read_bytes()).hexdigest() for p in writer.parts]
@@ -98,4 +98,5 @@ ssh_key = "/root/.ssh/key"
         assert config.chunk_size_mb == 4096
         assert config.workers == 0  # auto
         assert config.min_partition_size_gb == 256
-        assert config.max_file_size_mb == 100
\ No newline at end of file
+        assert config.max_file_size_mb == 100
+        assert config.zstd_adapt is False
\ No newline at end of file
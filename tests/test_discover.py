@@ -0,0 +1,131 @@
+"""
+Tests for device discovery helpers (mocked lsblk/blkid/findmnt output).
+"""
+import json
+
+import pytest
+
+from docrip import discover
+from docrip.layers import pk_disk_of
+
+
+LSBLK_J = {
+    "blockdevices": [
+        {"name": "sda", "kname": "sda", "pkname": None, "path": "/dev/sda",
+         "type": "disk", "size": 2 * 1024**4, "fstype": None, "model": "DISK",
+         "children": [
+             {"name": "sda1", "kname": "sda1", "pkname": "sda", "path": "/dev/sda1",
+              "type": "part", "size": 512 * 1024**3, "fstype": "ext4", "uuid": "1111"},
+             {"name": "sda2", "kname": "sda2", "pkname": "sda", "path": "/dev/sda2",
+              "type": "part", "size": 1024**4, "fstype": "crypto_LUKS"},
+             {"name": "sda3", "kname": "sda3", "pkname": "sda", "path": "/dev/sda3",
+              "type": "part", "size": 400 * 1024**3, "fstype": "LVM2_member",
+              "children": [
+                  {"name": "vg-root", "kname": "dm-0", "pkname": "sda3",
+                   "path": "/dev/mapper/vg-root", "type": "lvm",
+                   "size": 300 * 1024**3, "fstype": "xfs"},
+              ]},
+         ]},
+        {"name": "sdb", "kname": "sdb", "pkname": None, "path": "/dev/sdb",
+         "type": "disk", "size": 16 * 1024**3, "fstype": None,
+         "children": [
+             {"name": "sdb1", "kname": "sdb1", "pkname": "sdb", "path": "/dev/sdb1",
+              "type": "part", "size": 16 * 1024**3, "fstype": "iso9660"},
+         ]},
+    ]
+}
+
+BLKID_EXPORT = """\
+DEVNAME=/dev/sda1
+UUID=1111
+TYPE=ext4
+
+DEVNAME=/dev/sda2
+TYPE=crypto_LUKS
+"""
+
+FINDMNT_J = {
+    "filesystems": [
+        {"source": "/dev/sdb1", "target": "/cdrom"},
+        {"source": "overlay", "target": "/"},
+    ]
+}
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    calls = []
+
+    def run(cmd, check=True, capture=False, env=None, dry=False):
+        calls.append(cmd[0])
+        if cmd[0] == "lsblk":
+            return 0, json.dumps(LSBLK_J)
+        if cmd[0] == "blkid":
+            return 0, BLKID_EXPORT
+        if cmd[0] == "findmnt":
+            return 0, json.dumps(FINDMNT_J)
+        return 1, ""
+
+    monkeypatch.setattr(discover, "run", run)
+    return calls
+
+
+def test_gather_state_one_call_per_tool(fake_run):
+    """Test the discovery snapshot costs one lsblk, blkid and findmnt call."""
+    state = discover.gather_state()
+
+    assert sorted(fake_run) == ["blkid", "findmnt", "lsblk"]
+    assert state.blkid_by_dev["/dev/sda1"]["TYPE"] == "ext4"
+    assert state.mounts["/cdrom"] == "/dev/sdb1"
+
+
+def test_pk_disk_of_walks_state(fake_run):
+    """Test parent disk resolution is a walk over the lsblk tree."""
+    state = discover.gather_state()
+
+    assert pk_disk_of(state, "sda1") == "/dev/sda"
+    assert pk_disk_of(state, "dm-0") == "/dev/sda"
+    assert pk_disk_of(state, "sda") == "/dev/sda"
+    assert pk_disk_of(state, "nope") is None
+
+
+def test_is_encrypted_reads_state(fake_run):
+    """Test encryption detection uses the batched blkid results."""
+    state = discover.gather_state()
+
+    assert discover.is_encrypted(state, "/dev/sda2", "")
+    assert not discover.is_encrypted(state, "/dev/sda1", "ext4")
+
+
+def test_collect_volumes_plan(fake_run, sample_config):
+    """Test volumes get stable numbering and skip reasons."""
+    sample_config.include_fstypes = ["ext4", "xfs"]
+    sample_config.skip_fstypes = ["swap", "iso9660"]
+    sample_config.min_partition_size_gb = 256
+
+    vols = {v.path: v for v in discover.collect_volumes(sample_config)}
+
+    assert vols["/dev/sda1"].skip_reason is None
+    assert (vols["/dev/sda1"].diskno, vols["/dev/sda1"].partno) == (0, 1)
+    assert vols["/dev/mapper/vg-root"].skip_reason is None
+    assert vols["/dev/mapper/vg-root"].diskno == 0
+    assert vols["/dev/sda2"].skip_reason == "unsupported_fstype:crypto_luks"
+    assert vols["/dev/sdb1"].skip_reason == "live_usb/avoid"
+    assert fake_run.count("lsblk") == 1
+
+
+def test_collect_volumes_probes_only_candidates(fake_run, sample_config, monkeypatch):
+    """Test the encryption probe is skipped for volumes already filtered out."""
+    sample_config.include_fstypes = []
+    sample_config.skip_fstypes = ["iso9660"]
+    sample_config.min_partition_size_gb = 450
+    probed = []
+    monkeypatch.setattr(
+        discover, "is_encrypted", lambda state, dev, fs: probed.append(dev) or fs == "crypto_luks"
+    )
+
+    vols = {v.path: v for v in discover.collect_volumes(sample_config)}
+
+    assert sorted(probed) == ["/dev/sda1", "/dev/sda2"]
+    assert vols["/dev/sda2"].skip_reason == "encrypted"
+    assert vols["/dev/mapper/vg-root"].encrypted is None
@@ -0,0 +1,83 @@
+"""
+Tests for the optional libarchive-based inline archiver.
+"""
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from docrip import inline_chunker
+from docrip.chunker import ChunkWriter
+from docrip.scanner import Scan
+
+libarchive = pytest.importorskip("libarchive")
+
+
+def test_filter_for():
+    """Test compressor settings map onto libarchive filters."""
+    assert inline_chunker.filter_for("zstd", 3, 4) == (
+        "zstd",
+        "zstd:compression-level=3,zstd:threads=4",
+    )
+    assert inline_chunker.filter_for("pigz", 6, 4) == ("gzip", "gzip:compression-level=6")
+    with pytest.raises(ValueError):
+        inline_chunker.filter_for("invalid", 3, 1)
+
+
+def test_stream_archive_roundtrip(tmp_path):
+    """Test listed entries are archived under their relative names and hashed."""
+    src = tmp_path / "src"
+    (src / "d").mkdir(parents=True)
+    (src / "d" / "f").write_bytes(b"payload")
+    (src / "skipped").write_bytes(b"not listed")
+
+    out = io.BytesIO()
+    digest = inline_chunker.stream_archive(
+        r"printf '.\0./d\0./d/f\0'",
+        src,
+        out,
+        hashlib.sha256(),
+        "gzip",
+        "gzip:compression-level=1",
+    )
+
+    assert digest == hashlib.sha256(out.getvalue()).hexdigest()
+    with libarchive.memory_reader(out.getvalue()) as archive:
+        entries = {e.pathname: e.size for e in archive}
+    assert entries == {"./": 0, "./d/": 0, "./d/f": 7}
+
+
+class _LaggingHash:
+    """sha256 whose updates trail the writer, as a busy hash thread would."""
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+
+    def update(self, data):
+        time.sleep(0.002)
+        self._h.update(data)
+
+    def hexdigest(self):
+        return self._h.hexdigest()
+
+
+def test_stream_archive_into_background_writer(tmp_path, monkeypatch):
+    """Test libarchive's reused block never corrupts background part hashes."""
+    monkeypatch.setattr("docrip.chunker.new_hasher", lambda algo: _LaggingHash())
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(8):
+        (src / f"f{i}").write_bytes(os.urandom(1024 * 1024))
+
+    writer = ChunkWriter(str(tmp_path / "p"), 1024 * 1024, "sha256", background=True)
+    digest = inline_chunker.stream_archive(
+        Scan(src), src, writer, hashlib.sha256(), "none", ""
+    )
+    writer.close()
+
+    assert len(writer.parts) > 4
+    data = b"".join(p.read_bytes() for p in writer.parts)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert writer.digests == [hashlib.sha256(p.read_bytes()).hexdigest() for p in writer.parts]
@@ -0,0 +1,144 @@
+"""
+Tests for orchestrator worker pools (dry runs; nothing is mounted).
+"""
+import concurrent.futures
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from docrip import orchestrator
+from docrip.orchestrator import make_executor, process_one
+from docrip.types import Volume, VolumeResult
+
+
+def test_process_pool_round_trips_volumes(sample_config, tmp_path):
+    """Test process_one runs in a forkserver worker and its result pickles back."""
+    sample_config.spool_dir = tmp_path
+    v = Volume("/dev/sdz1", "sdz1", "ext4", 1, "part", None, None, 0, 1, None)
+
+    with make_executor(sample_config, 1) as ex:
+        assert isinstance(ex, concurrent.futures.ProcessPoolExecutor)
+        r = ex.submit(process_one, sample_config, v, "abcde", "20240101", 1, True).result()
+
+    assert (r.device, r.status) == ("/dev/sdz1", "ok")
+    assert list(tmp_path.iterdir()) == []  # a dry run creates no spool directories
+
+
+def test_thread_executor(sample_config):
+    """Test the thread pool remains selectable."""
+    sample_config.executor = "thread"
+    with make_executor(sample_config, 2) as ex:
+        assert isinstance(ex, concurrent.futures.ThreadPoolExecutor)
+
+
+def test_run_plan_without_volumes_skips_pool(sample_config, tmp_path, monkeypatch):
+    """Test an empty plan writes its summary without a pool or spool directory."""
+    sample_config.run_summary_dir = tmp_path / "log"
+    sample_config.spool_dir = tmp_path / "spool"
+    monkeypatch.setattr(orchestrator, "check_optional_tools", lambda: None)
+    monkeypatch.setattr(orchestrator, "assemble_layers", lambda *a, **k: None)
+    monkeypatch.setattr(orchestrator, "gather_state", lambda **k: None)
+    monkeypatch.setattr(orchestrator, "collect_volumes", lambda cfg, state: [])
+
+    def no_pool(*a):
+        raise AssertionError("executor created for an empty plan")
+
+    monkeypatch.setattr(orchestrator, "make_executor", no_pool)
+
+    assert orchestrator.run_plan(sample_config, None, False, None, False) == 0
+    assert not sample_config.spool_dir.exists()
+    (summary,) = sample_config.run_summary_dir.glob("run-*.json")
+    assert json.loads(summary.read_text())["volumes_processed"] == 0
+
+
+def test_interrupt_cancels_queued_volumes(sample_config, monkeypatch):
+    """Test Ctrl-C in a worker cancels the queued volumes and still stops the master."""
+    sample_config.executor = "thread"
+    ran, stopped = [], []
+
+    def fake_process_one(cfg, v, *args):
+        ran.append(v.kname)
+        if v.kname == "v0":
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(orchestrator, "process_one", fake_process_one)
+    monkeypatch.setattr(orchestrator, "start_master", lambda cfg, **kw: True)
+    monkeypatch.setattr(orchestrator, "stop_master", lambda cfg, **kw: stopped.append(True))
+    vols = [
+        Volume(f"/dev/sdz{i}", f"v{i}", "ext4", 1, "part", None, None, 0, i, None)
+        for i in range(4)
+    ]
+
+    with pytest.raises(KeyboardInterrupt):
+        orchestrator.process_all(sample_config, vols, 1, "abcde", "20240101", True)
+
+    assert ran == ["v0"]
+    assert stopped == [True]
+
+
+class _BrokenPool:
+    """Executor stub: v0 finishes, every other worker dies mid-volume."""
+
+    def submit(self, fn, cfg, v, *args):
+        f = concurrent.futures.Future()
+        if v.kname == "v0":
+            f.set_result(VolumeResult(v.path, v.fstype, v.size_bytes, "v0", "", "ok", 1.0))
+        else:
+            f.set_exception(concurrent.futures.process.BrokenProcessPool("killed"))
+        return f
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_broken_pool_still_writes_summary(sample_config, tmp_path, monkeypatch):
+    """Test a dead worker is recorded as an exception and the run still reports."""
+    sample_config.run_summary_dir = tmp_path / "log"
+    sample_config.spool_dir = tmp_path / "spool"
+    vols = [
+        Volume(f"/dev/sdz{i}", f"v{i}", "ext4", 2**30, "part", None, None, 0, i, None)
+        for i in range(3)
+    ]
+    monkeypatch.setattr(orchestrator, "check_optional_tools", lambda: None)
+    monkeypatch.setattr(orchestrator, "assemble_layers", lambda *a, **k: None)
+    monkeypatch.setattr(orchestrator, "gather_state", lambda **k: None)
+    monkeypatch.setattr(orchestrator, "collect_volumes", lambda cfg, state: vols)
+    monkeypatch.setattr(orchestrator, "ensure_dir", lambda p: None)  # keep off /mnt
+    monkeypatch.setattr(orchestrator, "start_master", lambda cfg, **kw: True)
+    monkeypatch.setattr(orchestrator, "stop_master", lambda cfg, **kw: None)
+    monkeypatch.setattr(orchestrator, "make_executor", lambda cfg, n: _BrokenPool())
+
+    assert orchestrator.run_plan(sample_config, None, False, None, False) == 1
+    (summary,) = sample_config.run_summary_dir.glob("run-*.json")
+    results = {r["device"]: r for r in json.loads(summary.read_text())["results"]}
+    assert results["/dev/sdz0"]["status"] == "ok"
+    for dev in ("/dev/sdz1", "/dev/sdz2"):
+        assert results[dev]["status"] == "exception"
+        assert results[dev]["error"] == "worker died: killed"
+
+
+def test_started_utc_precedes_first_volume(sample_config, tmp_path, monkeypatch):
+    """Test the summary's started_utc is taken before any volume starts."""
+    sample_config.executor = "thread"
+    sample_config.run_summary_dir = tmp_path / "log"
+    v = Volume("/dev/sdz1", "sdz1", "ext4", 2**30, "part", None, None, 0, 1, None)
+    began = []
+
+    def fake_process_one(cfg, v, *args):
+        began.append(datetime.now(timezone.utc))
+        return VolumeResult(v.path, v.fstype, v.size_bytes, "sdz1", "", "ok", 0.0)
+
+    monkeypatch.setattr(orchestrator, "check_optional_tools", lambda: None)
+    monkeypatch.setattr(orchestrator, "assemble_layers", lambda *a, **k: None)
+    monkeypatch.setattr(orchestrator, "gather_state", lambda **k: None)
+    monkeypatch.setattr(orchestrator, "collect_volumes", lambda cfg, state: [v])
+    monkeypatch.setattr(orchestrator, "ensure_dir", lambda p: None)  # keep off /mnt
+    monkeypatch.setattr(orchestrator, "start_master", lambda cfg, **kw: True)
+    monkeypatch.setattr(orchestrator, "stop_master", lambda cfg, **kw: None)
+    monkeypatch.setattr(orchestrator, "process_one", fake_process_one)
+
+    assert orchestrator.run_plan(sample_config, None, False, None, False) == 0
+    (summary,) = sample_config.run_summary_dir.glob("run-*.json")
+    started = datetime.fromisoformat(json.loads(summary.read_text())["started_utc"])
+    assert started <= began[0]
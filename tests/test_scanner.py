@@ -0,0 +1,61 @@
+"""
+Tests for the in-process scandir file lister.
+"""
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from docrip.archiver import build_find_cmd, file_lister
+from docrip.scanner import Scan, iter_paths
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "etc" / "deep").mkdir(parents=True)
+    (tmp_path / "etc" / "small").write_bytes(b"x" * 10)
+    (tmp_path / "etc" / "deep" / "empty").write_bytes(b"")
+    with open(tmp_path / "big", "wb") as f:
+        f.truncate(3 * 1024 * 1024)  # sparse: 3 MiB apparent size
+    (tmp_path / "link").symlink_to("etc/small")
+    os.mkfifo(tmp_path / "fifo")
+    return tmp_path
+
+
+def test_iter_paths_selection(tree):
+    """Test dirs and symlinks are always listed, files by size, others never."""
+    assert set(iter_paths(tree)) == {
+        b".", b"./etc", b"./etc/deep", b"./etc/small", b"./etc/deep/empty", b"./big", b"./link",
+    }
+    assert b"./big" not in set(iter_paths(tree, 3))
+    assert b"./big" in set(iter_paths(tree, 4))
+
+
+@pytest.mark.skipif(not shutil.which("find"), reason="find(1) not installed")
+@pytest.mark.parametrize("max_mb", [0, 3, 4])
+def test_iter_paths_matches_find(monkeypatch, tree, max_mb):
+    """Test the walk selects exactly what the find expression does."""
+    monkeypatch.setattr("docrip.archiver._have_tool", lambda name: False)
+    out = subprocess.run(
+        ["/bin/sh", "-c", build_find_cmd(tree, max_mb)], capture_output=True, check=True
+    ).stdout
+    assert set(iter_paths(tree, max_mb)) == set(out.split(b"\0")) - {b""}
+
+
+def test_scan_counts_errors(tmp_path):
+    """Test a missing root is reported like find's non-zero exit."""
+    scan = Scan(tmp_path / "missing")
+    assert list(scan.paths()) == []
+    assert scan.errors == 1
+
+
+def test_file_lister_choice(monkeypatch, tmp_path):
+    """Test auto falls back to scandir only when docrip-scan is missing."""
+    monkeypatch.setattr("docrip.archiver._have_tool", lambda name: False)
+    assert isinstance(file_lister(tmp_path, 0, "auto"), Scan)
+    assert isinstance(file_lister(tmp_path, 0, "find"), str)
+
+    monkeypatch.setattr("docrip.archiver._have_tool", lambda name: name == "docrip-scan")
+    assert file_lister(tmp_path, 0, "auto").startswith("docrip-scan")
+    assert isinstance(file_lister(tmp_path, 0, "python"), Scan)
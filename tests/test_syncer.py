@@ -0,0 +1,120 @@
+"""
+Tests for syncer module (rsync command construction; rsync is not run).
+"""
+import shlex
+
+from docrip import syncer
+
+
+def _files(d, sizes):
+    for name, size in sizes.items():
+        (d / name).write_bytes(b"x" * size)
+
+
+def test_bucket_files_balances_by_size(tmp_path):
+    """Test largest-first bin packing evens out bytes per bucket."""
+    _files(tmp_path, {"p0000": 100, "p0001": 100, "p0002": 60, "p0003": 40, ".parts": 1})
+
+    buckets = syncer.bucket_files(tmp_path, 2)
+
+    assert sorted(n for b in buckets for n in b) == [".parts", "p0000", "p0001", "p0002", "p0003"]
+    totals = sorted(sum((tmp_path / n).stat().st_size for n in b) for b in buckets)
+    assert totals == [141, 160]
+    assert len(syncer.bucket_files(tmp_path, 10)) == 5
+
+
+def test_rsync_streams_shared_by_workers(monkeypatch, sample_config):
+    """Test the stream budget is for the run, split between concurrent volumes."""
+    monkeypatch.setattr(syncer, "CPU_COUNT", 32)
+    assert syncer.rsync_streams(sample_config) == 8
+    assert syncer.rsync_streams(sample_config, workers=4) == 2
+    assert syncer.rsync_streams(sample_config, workers=16) == 1
+    sample_config.rsync_parallel = 3
+    assert syncer.rsync_streams(sample_config) == 3
+    assert syncer.rsync_streams(sample_config, workers=2) == 1
+
+
+def test_rsync_dir_parallel(monkeypatch, tmp_path, sample_config):
+    """Test each bucket gets its own rsync with a NUL-separated file list."""
+    _files(tmp_path, {"a": 10, "b": 10, "c": 10})
+    sample_config.rsync_parallel = 2
+    sample_config.rsync_bwlimit_kbps = 1000
+    cmds = []
+    monkeypatch.setattr(syncer, "run", lambda cmd, **kw: cmds.append(cmd) or (0, ""))
+
+    assert syncer.rsync_dir(sample_config, tmp_path, "20240101", "abcde")
+    assert len(cmds) == 2
+    assert all("--from0" in c and "--bwlimit=500" in c for c in cmds)
+
+
+def test_rsync_dir_bwlimit_split_across_workers(monkeypatch, tmp_path, sample_config):
+    """Test the bandwidth cap is shared by every stream of every volume in flight."""
+    _files(tmp_path, {"a": 10, "b": 10, "c": 10})
+    sample_config.rsync_parallel = 4
+    sample_config.rsync_bwlimit_kbps = 1000
+    cmds = []
+    monkeypatch.setattr(syncer, "run", lambda cmd, **kw: cmds.append(cmd) or (0, ""))
+
+    assert syncer.rsync_dir(sample_config, tmp_path, "20240101", "abcde", workers=2)
+    assert len(cmds) == 2  # 4 streams for the run, 2 per volume
+    assert all("--bwlimit=250" in c for c in cmds)
+
+    cmds.clear()
+    assert syncer.rsync_dir(sample_config, tmp_path, "20240101", "abcde", workers=8)
+    assert len(cmds) == 1 and "--bwlimit=125" in cmds[0]
+
+
+def test_rsync_cmd_keeps_append_resume(sample_config, tmp_path):
+    """Test the resume flags are never combined with --whole-file (rsync rejects it)."""
+    cmd = syncer.rsync_cmd(sample_config, tmp_path, "host:/dst/", 0)
+
+    assert "--append-verify" in cmd and "--partial" in cmd
+    assert "--whole-file" not in cmd and "-W" not in cmd
+
+
+def test_rsync_ssh_reuses_control_master(monkeypatch, tmp_path, sample_config):
+    """Test rsync's ssh and the master share one ControlPath."""
+    cmds = []
+    monkeypatch.setattr(syncer, "run", lambda cmd, **kw: cmds.append(cmd) or (0, ""))
+    sample_config.rsync_parallel = 1
+    sample_config.server_port = 2222
+
+    syncer.start_master(sample_config)
+    syncer.rsync_dir(sample_config, tmp_path, "20240101", "abcde")
+    syncer.stop_master(sample_config)
+
+    master, rsync, stop = cmds
+    assert master[0] == "ssh" and "-Nf" in master and master[-1] == "test@localhost"
+    assert "ControlMaster=yes" in master and "ControlMaster=auto" not in master
+    assert f"ControlPath={syncer.CONTROL_PATH}" in rsync[rsync.index("-e") + 1]
+    assert stop[-3:] == ["-O", "exit", "test@localhost"]
+    # %C in ControlPath hashes the port, so every command must pass the same one
+    for cmd in (master, stop, shlex.split(rsync[rsync.index("-e") + 1])):
+        assert cmd[cmd.index("-p") + 1] == "2222"
+
+
+def test_parallel_streams_get_their_own_connections(monkeypatch, tmp_path, sample_config):
+    """Test concurrent streams never share one ControlPath (one TCP connection)."""
+    _files(tmp_path, {"a": 10, "b": 10})
+    sample_config.rsync_parallel = 2
+    cmds = []
+    monkeypatch.setattr(syncer, "run", lambda cmd, **kw: cmds.append(cmd) or (0, ""))
+
+    assert not syncer.start_master(sample_config)
+    assert syncer.rsync_dir(sample_config, tmp_path, "20240101", "abcde")
+    syncer.stop_master(sample_config)
+
+    assert len(cmds) == 2  # the two rsyncs; no master was started or stopped
+    assert not any("ControlPath" in c[c.index("-e") + 1] for c in cmds)
+
+    # one stream per volume, but two volumes uploading at once
+    sample_config.rsync_parallel = 1
+    assert syncer.multiplexed(sample_config)
+    assert not syncer.multiplexed(sample_config, workers=2)
+
+
+def test_ssh_host():
+    """Test only ssh remotes get a control master."""
+    assert syncer._ssh_host("user@host:/srv") == "user@host"
+    assert syncer._ssh_host("rsync://host/mod") is None
+    assert syncer._ssh_host("/local/path") is None
@@ -1,7 +1,11 @@
 """
 Tests for utility functions.
 """
+import json
+
 import pytest
+from docrip import util
+from docrip.types import VolumeResult
 from docrip.util import base36_digest5, host_identifier, clamp, utc_datestr
 
 
@@ -24,6 +28,23 @@ def test_base36_digest5():
     assert all(c in valid_chars for c in token1)
 
 
+def test_base36_digest5_known_values():
+    """Test tokens stay byte-for-byte stable: they end up in remote paths."""
+    assert base36_digest5("test:host-id") == "05mwj"
+    assert base36_digest5("test:host-id", "blake2b") == "5pjv2"
+
+
+def test_base36_digest5_blake2b():
+    """Test the opt-in BLAKE2b token is stable and differs from the SHA-256 one."""
+    token = base36_digest5("test:host-id", "blake2b")
+
+    assert token == base36_digest5("test:host-id", "blake2b")
+    assert token != base36_digest5("test:host-id")
+    assert len(token) == 5
+    with pytest.raises(ValueError):
+        base36_digest5("test:host-id", "md5")
+
+
 def test_host_identifier():
     """Test host identifier generation."""
     # Should return something non-empty
@@ -54,4 +75,82 @@ def test_utc_datestr():
     import datetime
     today = datetime.datetime.now(datetime.timezone.utc)
     expected = today.strftime("%Y%m%d")
-    assert date_str == expected
\ No newline at end of file
+    assert date_str == expected
+
+
+def test_run_shell_selection(monkeypatch):
+    """Test strings use sh unless they need bash; lists are exec'd directly."""
+    seen = []
+    monkeypatch.setattr(util.subprocess, "call", lambda argv, env=None: seen.append(argv) or 0)
+    util.run("echo hi | wc -c")
+    util.run("tee >(sha256sum) < f")
+    util.run(["echo", "hi"])
+
+    assert seen[0][:2] == ["/bin/sh", "-c"]
+    assert seen[1][:2] == ["/bin/bash", "-lc"]
+    assert seen[2] == ["echo", "hi"]
+
+
+def test_write_json_dataclass(tmp_path):
+    """Test dataclasses are written as their fields, sorted and indented."""
+    r = VolumeResult("/dev/sda1", "ext4", 1, "n", "/mnt/x", "ok", 1.5)
+    util.write_json(tmp_path / "r.json", {"results": [r]})
+
+    data = json.loads((tmp_path / "r.json").read_text())
+    assert data["results"][0]["device"] == "/dev/sda1"
+    assert data["results"][0]["error"] is None
+
+
+def test_json_output_independent_of_orjson(monkeypatch):
+    """Test dataclass fields are key-sorted with and without orjson."""
+    r = VolumeResult("/dev/sda1", "ext4", 1, "n", "/mnt/x", "ok", 1.5)
+    outputs = {util.dumps_json_line(r), util.dumps_json({"r": r})}
+    monkeypatch.setattr(util, "orjson", None)
+    fallback = {util.dumps_json_line(r), util.dumps_json({"r": r})}
+
+    assert outputs == fallback
+    assert list(json.loads(util.dumps_json_line(r))) == sorted(json.loads(util.dumps_json_line(r)))
+
+
+def test_write_json_non_atomic(tmp_path):
+    """Test in-place writes replace the file and leave no temporary behind."""
+    path = tmp_path / "v.json"
+    path.write_text("x" * 100)
+    util.write_json(path, {"a": 1}, atomic=False)
+
+    assert json.loads(path.read_text()) == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["v.json"]
+
+
+def test_write_json_non_atomic_short_writes(tmp_path, monkeypatch):
+    """Test in-place writes keep going when os.write writes only part of the data."""
+    real_write = util.os.write
+    monkeypatch.setattr(util.os, "write", lambda fd, b: real_write(fd, b[:3]))
+    path = tmp_path / "v.json"
+    util.write_json(path, {"name": "x" * 50}, atomic=False)
+
+    assert json.loads(path.read_text()) == {"name": "x" * 50}
+
+
+def test_write_json_compact(tmp_path):
+    """Test pretty=False writes one compact line with the same content."""
+    path = tmp_path / "run.json"
+    util.write_json(path, {"b": [1, 2], "a": "x"}, pretty=False)
+
+    assert path.read_bytes() == b'{"a":"x","b":[1,2]}'
+
+
+def test_write_jsonl(tmp_path):
+    """Test one compact JSON object is written per line."""
+    rs = [VolumeResult(f"/dev/sda{i}", "ext4", i, f"n{i}", "/mnt/x", "ok", 0.5) for i in (1, 2)]
+    util.write_jsonl(tmp_path / "v.jsonl", rs)
+
+    lines = (tmp_path / "v.jsonl").read_text().splitlines()
+    assert [json.loads(line)["device"] for line in lines] == ["/dev/sda1", "/dev/sda2"]
+
+
+def test_run_quiet_keeps_stderr_tail():
+    """Test quiet runs drop output but report stderr when the command fails."""
+    assert util.run(["sh", "-c", "echo out; echo err >&2"], quiet=True) == (0, "")
+    rc, err = util.run(["sh", "-c", "echo out; echo boom >&2; exit 3"], quiet=True)
+    assert (rc, err) == (3, "boom\n")